@@ -1,3 +1,4 @@
+from datetime import date
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 import os
@@ -8,6 +9,130 @@ class Settings(BaseSettings):
     supabase_key: str = ""
     openrouter_api_key: str = ""
     
+    # Storage backend: "supabase", "sqlite" or "memory"
+    storage_backend: str = "supabase"
+    sqlite_path: str = "ai_mole.db"
+    storage_seed_file: str = ""
+    
+    # Supabase HTTP connection pool
+    db_timeout: float = 30.0
+    db_max_connections: int = 20
+    db_max_keepalive_connections: int = 10
+    db_keepalive_expiry: float = 30.0
+    db_http2: bool = True
+    db_batch_size: int = 500
+    
+    # LLM provider: "openrouter" or "mock" (offline, for load testing)
+    llm_provider: str = "openrouter"
+    mock_llm_default_latency_ms: float = 800.0
+    mock_llm_default_error_rate: float = 0.0
+    mock_llm_latency_sigma: float = 0.5
+    mock_llm_seed: int = 0
+    # Per-model overrides keyed by model name or OpenRouter route, as JSON objects
+    mock_llm_latency_ms: dict[str, float] = {}
+    mock_llm_error_rates: dict[str, float] = {}
+    
+    # OpenRouter HTTP connection pool and concurrency limits
+    openrouter_timeout: float = 60.0
+    openrouter_max_connections: int = 50
+    openrouter_max_keepalive_connections: int = 20
+    llm_max_in_flight: int = 24
+    llm_per_model_concurrency: int = 4
+    
+    # Per-call timeout, hedging and per-round deadline for model calls
+    llm_model_timeout: float = 20.0
+    llm_round_deadline: float = 25.0
+    llm_hedging_enabled: bool = True
+    llm_hedge_min_samples: int = 20
+    # Overrides for prompts.MODEL_LATENCY_BUDGETS / prompts.FALLBACK_MODELS, as JSON objects
+    llm_latency_budgets: dict[str, float] = {}
+    llm_fallback_models: dict[str, str] = {}
+    
+    # Mark the static system prompt prefix with cache_control on routes that support it
+    llm_prompt_caching: bool = True
+    # Ask routes in prompts.JSON_MODE_ROUTE_PREFIXES for JSON-only replies
+    llm_json_mode: bool = True
+    
+    # Content-addressed cache of upstream replies: "none", "memory", "disk" or "db" (the storage backend)
+    llm_response_cache: str = "memory"
+    llm_response_cache_ttl: float = 30 * 24 * 3600
+    llm_response_cache_max_entries: int = 20000
+    llm_response_cache_max_bytes: int = 64 * 1024 * 1024
+    llm_response_cache_dir: str = "/tmp/ai-mole-llm-cache"
+    
+    # Circuit breaker per upstream model
+    circuit_window_seconds: float = 60.0
+    circuit_min_requests: int = 5
+    circuit_error_rate_threshold: float = 0.5
+    circuit_latency_threshold: float = 15.0
+    circuit_open_seconds: float = 30.0
+    circuit_half_open_probes: int = 1
+    
+    # Cross-worker generation lock: "none", "file" or "db" (Supabase only)
+    generation_lock: str = "none"
+    generation_lock_dir: str = "/tmp/ai-mole-locks"
+    generation_lock_ttl: float = 120.0
+    generation_lock_poll_interval: float = 0.5
+    
+    # In-process LRU cache of game_states rows (0 disables the limit)
+    state_cache_max_entries: int = 5000
+    state_cache_max_bytes: int = 64 * 1024 * 1024
+    state_cache_ttl: float = 0
+    
+    # Cache tier for game states and setups shared by all workers on a host: "none" or "sqlite"
+    shared_cache: str = "none"
+    shared_cache_path: str = "/tmp/ai-mole-shared-cache.db"
+    shared_cache_ttl: float = 2 * 24 * 3600
+    
+    # Write-behind of generated game states; off saves inline before responding
+    state_write_behind: bool = True
+    state_write_batch_size: int = 50
+    state_write_flush_interval: float = 0.05
+    state_write_max_retries: int = 5
+    state_write_retry_backoff: float = 0.5
+    state_write_retry_backoff_max: float = 30.0
+    # A row that fails this many flushes on its own is dead-lettered; past max_pending the oldest row is
+    state_write_max_row_failures: int = 3
+    state_write_max_pending: int = 10000
+    
+    # Game state keys: "compact" (date + bit-packed state) or "md5" (legacy hashes)
+    state_key_format: str = "compact"
+    # Last game date whose states may be saved under legacy MD5 keys (the day compact keys went live);
+    # lookups for later dates never try the MD5 key
+    state_key_legacy_until: date | None = None
+    
+    # Startup warm-up of pools, today's setup and state cache: "background" serves
+    # requests while it runs (see /api/ready), "blocking" finishes it before serving
+    startup_mode: str = "background"
+    
+    # Background warm-up of the daily setup (at startup and before midnight)
+    scheduler_enabled: bool = True
+    setup_prewarm_lead_seconds: float = 120.0
+    
+    # Background precomputation of the daily game tree
+    precompute_enabled: bool = True
+    precompute_max_states: int = 120
+    precompute_concurrency: int = 2
+    # Only one worker precomputes a date: a file lock in generation_lock_dir, or the
+    # generation_locks table when generation_lock is "db"; stale after this many seconds
+    precompute_lock_ttl: float = 3600.0
+    
+    # Word pair selection for new daily setups
+    word_pair_index_ttl: float = 3600.0
+    word_pair_exclude_recent_days: int = 30
+    word_pair_min_difficulty: int | None = None
+    word_pair_max_difficulty: int | None = None
+    
+    # Dialogue history in prompts: rough token budget, and words kept per message when condensing old rounds
+    history_token_budget: int = 800
+    history_summary_words: int = 8
+    history_cache_max_entries: int = 2000
+    
+    # Per-request tracing: "none", "console", "file" or "otel" (needs opentelemetry-api)
+    tracing_exporter: str = "none"
+    tracing_sample_rate: float = 0.1
+    tracing_file: str = "traces.jsonl"
+    
     class Config:
         env_file = ".env"
         extra = "allow"
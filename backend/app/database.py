@@ -1,5 +1,6 @@
 import httpx
 from app.config import get_settings
+from app.metrics import DB_ERRORS, DB_QUERY_SECONDS
 
 settings = get_settings()
 
@@ -16,79 +17,237 @@ def get_headers():
     }
 
 
+# One pooled HTTP client per process, opened/closed by the FastAPI lifecycle hooks
+_http_client: httpx.AsyncClient | None = None
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.db_max_connections,
+        max_keepalive_connections=settings.db_max_keepalive_connections,
+        keepalive_expiry=settings.db_keepalive_expiry
+    )
+
+    http2 = settings.db_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("h2 not installed, falling back to HTTP/1.1 for Supabase")
+            http2 = False
+
+    return httpx.AsyncClient(timeout=settings.db_timeout, limits=limits, http2=http2)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _create_http_client()
+    return _http_client
+
+
+async def init_db():
+    """Open the shared Supabase connection pool."""
+    get_http_client()
+
+
+async def close_db():
+    """Close the shared Supabase connection pool."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 class Response:
     def __init__(self, data):
         self.data = data
 
 
+class DatabaseError(Exception):
+    """A Supabase REST request failed; only raised by execute(raise_on_error=True).
+
+    `status_code` is the HTTP status, or None for network errors.
+    """
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
 class TableQuery:
-    def __init__(self, base_url: str, headers: dict, table_name: str):
+    def __init__(self, base_url: str, headers: dict, table_name: str, client: httpx.AsyncClient):
         self.base_url = base_url
         self.headers = headers.copy()
         self.table_name = table_name
         self.url = f"{base_url}/{table_name}"
+        self.client = client
         self._filters = []
         self._select_columns = "*"
+        self._limit = None
         self._data_to_insert = None
-    
+        self._on_conflict = None
+        self._batch_size = settings.db_batch_size
+        self._delete = False
+
     def select(self, columns: str = "*"):
         self._select_columns = columns
         return self
-    
+
     def eq(self, column: str, value):
         self._filters.append(f"{column}=eq.{value}")
         return self
-    
-    def insert(self, data: dict):
+
+    def lt(self, column: str, value):
+        self._filters.append(f"{column}=lt.{value}")
+        return self
+
+    def gte(self, column: str, value):
+        self._filters.append(f"{column}=gte.{value}")
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def insert(self, data: dict | list[dict], batch_size: int = None):
+        """Insert one row, or many rows in chunks of `batch_size`."""
         self._data_to_insert = data
+        if batch_size:
+            self._batch_size = batch_size
+        return self
+
+    def upsert(
+        self,
+        data: dict | list[dict],
+        on_conflict: str,
+        ignore_duplicates: bool = False,
+        batch_size: int = None
+    ):
+        """Insert rows, merging (or skipping) those that clash on `on_conflict`."""
+        self.insert(data, batch_size)
+        self._on_conflict = on_conflict
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        self.headers["Prefer"] = f"return=representation,resolution={resolution}"
         return self
-    
-    def execute(self):
+
+    def delete(self):
+        self._delete = True
+        return self
+
+    def _filter_params(self) -> list[tuple[str, str]]:
+        # Supabase uses query params for filters; a column may be filtered more than once
+        params = []
+        for f in self._filters:
+            col, val = f.split("=", 1)
+            params.append((col, val))
+        return params
+
+    async def _write(self, raise_on_error: bool = False):
+        # INSERT/UPSERT operation, one request per chunk
+        params = {"on_conflict": self._on_conflict} if self._on_conflict else None
+
+        if isinstance(self._data_to_insert, dict):
+            chunks = [self._data_to_insert]
+        else:
+            rows = self._data_to_insert
+            chunks = [rows[i:i + self._batch_size] for i in range(0, len(rows), self._batch_size)]
+
+        written = []
+        failed_rows = 0
+        for chunk in chunks:
+            try:
+                response = await self.client.post(
+                    self.url,
+                    headers=self.headers,
+                    params=params,
+                    json=chunk
+                )
+                response.raise_for_status()
+                data = response.json() if response.content else []
+                written.extend(data if isinstance(data, list) else [data])
+            except httpx.HTTPStatusError as e:
+                DB_ERRORS.inc(table=self.table_name, operation=self._operation())
+                print(f"HTTP Error: {e.response.status_code} - {e.response.text}")
+                if raise_on_error:
+                    raise DatabaseError(f"{e.response.status_code} - {e.response.text}", e.response.status_code) from e
+                failed_rows += len(chunk) if isinstance(chunk, list) else 1
+            except Exception as e:
+                DB_ERRORS.inc(table=self.table_name, operation=self._operation())
+                print(f"Database error: {str(e)}")
+                if raise_on_error:
+                    raise DatabaseError(str(e)) from e
+                failed_rows += len(chunk) if isinstance(chunk, list) else 1
+
+        if failed_rows:
+            print(f"Partial write to {self.table_name}: {failed_rows} rows in failed chunks were not written")
+
+        return Response(written)
+
+    def _operation(self) -> str:
+        if self._delete:
+            return "delete"
+        if self._data_to_insert is not None:
+            return "upsert" if self._on_conflict else "insert"
+        return "select"
+
+    async def execute(self, raise_on_error: bool = False):
+        """Run the query. Failures are logged and give empty data, unless
+        `raise_on_error` is set, in which case they raise DatabaseError."""
+        with DB_QUERY_SECONDS.time(table=self.table_name, operation=self._operation()):
+            return await self._execute(raise_on_error)
+
+    async def _execute(self, raise_on_error: bool = False):
         try:
-            with httpx.Client(timeout=30.0) as client:
-                if self._data_to_insert is not None:
-                    # INSERT operation
-                    response = client.post(
-                        self.url,
-                        headers=self.headers,
-                        json=self._data_to_insert
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    return Response(data if isinstance(data, list) else [data])
-                else:
-                    # SELECT operation
-                    params = {"select": self._select_columns}
-                    
-                    # Build filter query string
-                    if self._filters:
-                        # Supabase uses query params for filters
-                        for f in self._filters:
-                            col, val = f.split("=", 1)
-                            params[col] = val
-                    
-                    response = client.get(
-                        self.url,
-                        headers=self.headers,
-                        params=params
-                    )
-                    response.raise_for_status()
-                    return Response(response.json())
+            if self._delete:
+                # DELETE operation
+                response = await self.client.delete(
+                    self.url,
+                    headers=self.headers,
+                    params=self._filter_params()
+                )
+                response.raise_for_status()
+                return Response(response.json() if response.content else [])
+            elif self._data_to_insert is not None:
+                return await self._write(raise_on_error)
+            else:
+                # SELECT operation
+                params = [("select", self._select_columns)]
+                params.extend(self._filter_params())
+                if self._limit is not None:
+                    params.append(("limit", str(self._limit)))
+
+                response = await self.client.get(
+                    self.url,
+                    headers=self.headers,
+                    params=params
+                )
+                response.raise_for_status()
+                return Response(response.json())
+        except DatabaseError:
+            raise
         except httpx.HTTPStatusError as e:
+            DB_ERRORS.inc(table=self.table_name, operation=self._operation())
             print(f"HTTP Error: {e.response.status_code} - {e.response.text}")
+            if raise_on_error:
+                raise DatabaseError(f"{e.response.status_code} - {e.response.text}", e.response.status_code) from e
             return Response([])
         except Exception as e:
+            DB_ERRORS.inc(table=self.table_name, operation=self._operation())
             print(f"Database error: {str(e)}")
+            if raise_on_error:
+                raise DatabaseError(str(e)) from e
             return Response([])
 
 
+
 class SupabaseClient:
     def __init__(self):
         self.base_url = SUPABASE_REST_URL
         self.headers = get_headers()
-    
+
     def table(self, table_name: str):
-        return TableQuery(self.base_url, self.headers, table_name)
+        return TableQuery(self.base_url, self.headers, table_name, get_http_client())
 
 
 # Create client lazily to avoid startup errors
@@ -100,4 +259,3 @@ def get_db() -> SupabaseClient:
     if _supabase is None:
         _supabase = SupabaseClient()
     return _supabase
-
@@ -1,6 +1,18 @@
-from fastapi import FastAPI
+import time
+from app.startup import record_import_phase, startup_phase
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.config import get_settings
+from app.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, render_metrics
 from app.routers import game
+from app.tracing import TracingMiddleware
+from app.storage import init_storage, close_storage
+from app.services.llm_providers import close_llm_provider
+from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services.shared_cache import close_shared_cache
+from app.services.state_writer import start_state_writer, stop_state_writer
+from app.services.warmup import start_warm_up, stop_warm_up, warm_up
 
 app = FastAPI(
     title="AI Mole Game API",
@@ -21,10 +33,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request ids and sampled per-request traces
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(game.router)
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc(method=request.method)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec(method=request.method)
+        # Label by route template, not raw path, so label values stay bounded.
+        # For streaming responses this is the time to the first byte.
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+
+@app.on_event("startup")
+async def startup():
+    record_import_phase()
+    
+    with startup_phase("storage"):
+        await init_storage()
+    start_state_writer()
+    
+    # Background mode starts serving now; /api/ready reports when warm-up is done
+    if get_settings().startup_mode == "blocking":
+        await warm_up()
+    else:
+        start_warm_up()
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_warm_up()
+    await stop_scheduler()
+    await stop_state_writer()
+    await close_shared_cache()
+    await close_storage()
+    await close_llm_provider()
+
+
 @app.get("/")
 async def root():
     return {
@@ -37,3 +100,9 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of the request, storage, cache and LLM metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
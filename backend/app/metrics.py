@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+_registry: list["_Metric"] = []
+_lock = threading.Lock()
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: dict = None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            # [cumulative bucket counts, sum, count]
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': bound})} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    with _lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# HTTP routes
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", ("method",))
+
+# Storage
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Supabase REST query latency", ("table", "operation"))
+DB_ERRORS = Counter("db_query_errors_total", "Failed Supabase REST requests", ("table", "operation"))
+STATE_LOOKUP_SECONDS = Histogram("state_lookup_duration_seconds", "get_cached_state latency", ("source",))
+STATE_SAVE_SECONDS = Histogram("state_save_duration_seconds", "save_game_state latency")
+STATE_CACHE_LOOKUPS = Counter("state_cache_lookups_total", "Game state lookups by cache tier and result", ("tier", "result"))
+SHARED_CACHE_LOOKUPS = Counter("shared_cache_lookups_total", "Cross-worker cache tier lookups by namespace and result", ("namespace", "result"))
+STATE_WRITES_PENDING = Gauge("state_writes_pending", "Game states queued for write-behind and not yet stored")
+STATE_WRITE_BATCH_SECONDS = Histogram("state_write_batch_duration_seconds", "Write-behind batch latency", ("outcome",))
+STATE_WRITE_RETRIES = Counter("state_write_retries_total", "Write-behind batches retried after a storage error")
+STATE_WRITES_DROPPED = Counter("state_writes_dropped_total", "Game states given up on by write-behind", ("reason",))
+
+# Startup
+STARTUP_PHASE_SECONDS = Gauge("startup_phase_seconds", "Time spent in each startup phase of this process", ("phase",))
+
+# LLM upstreams
+LLM_REQUEST_SECONDS = Histogram("llm_request_duration_seconds", "Upstream model call latency", ("model", "outcome"))
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "Upstream model calls in progress", ("model",))
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the upstream", ("model", "type"))
+AI_RESPONSE_SECONDS = Histogram("ai_response_duration_seconds", "generate_ai_response latency per player, hedging included", ("model", "outcome"))
+LLM_PARSE_RESULTS = Counter("llm_parse_results_total", "Model reply parse outcomes (ok, repaired, partial, raw)", ("model", "status"))
+LLM_MESSAGES_TRUNCATED = Counter("llm_messages_truncated_total", "Replies cut down to the 30-word message limit", ("model",))
+LLM_RESPONSE_CACHE_LOOKUPS = Counter("llm_response_cache_lookups_total", "Content-addressed LLM reply cache lookups", ("backend", "result"))
+LLM_ROUND_SECONDS = Histogram("llm_round_duration_seconds", "generate_all_responses latency for a full round")
@@ -17,17 +17,51 @@ OPENROUTER_MODELS = {
     "DeepSeek": "deepseek/deepseek-chat"
 }
 
+# Expected p95 latency (seconds) per model; a hedged request goes out once a call exceeds it
+MODEL_LATENCY_BUDGETS = {
+    "Gemini": 4.0,
+    "Claude": 8.0,
+    "ChatGPT": 5.0,
+    "Qwen": 8.0,
+    "Llama": 6.0,
+    "DeepSeek": 10.0
+}
+
+# Fallback OpenRouter routes used for hedged requests and when the primary fails
+FALLBACK_MODELS = {
+    "Gemini": "google/gemini-2.0-flash-lite-001",
+    "Claude": "anthropic/claude-3.5-haiku",
+    "ChatGPT": "openai/gpt-3.5-turbo",
+    "Qwen": "qwen/qwen-2.5-7b-instruct",
+    "Llama": "meta-llama/llama-3.1-70b-instruct",
+    "DeepSeek": "deepseek/deepseek-chat-v3-0324"
+}
+
 
-def get_system_prompt(model_name: str, assigned_word: str, category: str, round_number: int, previous_dialogues: list = None) -> str:
-    """Generate system prompt for AI model."""
+def format_history(rounds: list[tuple[int | None, list[dict]]], omitted_rounds: int = 0) -> str:
+    """Format earlier rounds' dialogues, oldest first, for the system prompt.
     
-    history_context = ""
-    if previous_dialogues and len(previous_dialogues) > 0:
-        history_context = "\n\n📜 ÖNCEKİ TURLARDAN KONUŞMALAR:\n"
-        for dialogue in previous_dialogues:
-            history_context += f"- {dialogue['model_name']}: {dialogue['message']}\n"
+    `rounds` holds (round_number, dialogues) pairs; a round number of None
+    leaves out the per-round heading.
+    """
     
-    return f"""Sen "{model_name}" adlı bir yapay zeka modelisin ve "Köstebek" adlı REKABETÇI bir sosyal çıkarım oyununa katılıyorsun.
+    if not rounds:
+        return ""
+    
+    lines = ["", "", "📜 ÖNCEKİ TURLARDAN KONUŞMALAR:"]
+    if omitted_rounds:
+        lines.append(f"(Daha önceki {omitted_rounds} tur kısalık için çıkarıldı)")
+    for round_number, dialogues in rounds:
+        if round_number is not None:
+            lines.append(f"Tur {round_number}:")
+        lines.extend(f"- {dialogue['model_name']}: {dialogue['message']}" for dialogue in dialogues)
+    
+    return "\n".join(lines) + "\n"
+
+
+# Everything in the system prompt that is the same for every model, round and day.
+# It goes first so upstream prompt caches can reuse it; per-call details follow in the suffix.
+SYSTEM_PROMPT_PREFIX = """Sen "Köstebek" adlı REKABETÇI bir sosyal çıkarım oyununa katılan bir yapay zeka modelisin.
 
 🎮 OYUN KURALLARI:
 - 6 AI model yarışıyor
@@ -36,11 +70,6 @@ def get_system_prompt(model_name: str, assigned_word: str, category: str, round_
 - Masumlar köstebeği bulmaya, köstebek ise kendini gizlemeye çalışıyor
 - Kullanıcılar kimlerin aynı şeyi tarif ettiğini analiz ederek köstebeği tahmin edecek
 
-🎯 SENİN KELİMEN: "{assigned_word}"
-📂 KATEGORİ: {category}
-🔄 TUR: {round_number}
-{history_context}
-
 ⚔️ STRATEJİK KURALLAR (ÇOK ÖNEMLİ!):
 
 1. 🚫 ASLA KELİMEYİ DOĞRUDAN SÖYLEME
@@ -73,12 +102,56 @@ def get_system_prompt(model_name: str, assigned_word: str, category: str, round_
 - "Rakipleriyle karşılaştırıldığında, taraftarları bunu bir hakaret olarak görür."
 
 📋 ÇIKTI FORMATI (sadece JSON):
-{{
+{
     "message": "Kullanıcılara gösterilecek zekice, dolaylı ipucun",
     "internal_thought": "Stratejin ve düşüncelerin (gizli)"
-}}
+}
 
-SADECE JSON döndür, başka bir şey yazma."""
+SADECE JSON döndür, başka bir şey yazma.
+"""
+
+# OpenRouter route prefixes whose providers take explicit `cache_control` breakpoints.
+# OpenAI, DeepSeek and most others cache matching prefixes automatically.
+PROMPT_CACHE_ROUTE_PREFIXES = ("anthropic/", "google/")
+
+# Route prefixes that accept `response_format: {"type": "json_object"}` through OpenRouter
+JSON_MODE_ROUTE_PREFIXES = ("openai/", "google/", "deepseek/", "qwen/")
+
+
+def get_system_prompt_suffix(
+    model_name: str,
+    assigned_word: str,
+    category: str,
+    round_number: int,
+    history: str = ""
+) -> str:
+    """The per-call part of the system prompt that follows SYSTEM_PROMPT_PREFIX."""
+    
+    return f"""
+🪪 SENİN ADIN: "{model_name}"
+🎯 SENİN KELİMEN: "{assigned_word}"
+📂 KATEGORİ: {category}
+🔄 TUR: {round_number}
+{history}"""
+
+
+def build_system_message(openrouter_model: str, suffix: str, cache_prefix: bool = True) -> dict:
+    """System message for one upstream call.
+    
+    Routes in PROMPT_CACHE_ROUTE_PREFIXES get the static prefix as its own
+    content part marked with an ephemeral cache_control breakpoint.
+    """
+    
+    if cache_prefix and openrouter_model.startswith(PROMPT_CACHE_ROUTE_PREFIXES):
+        return {
+            "role": "system",
+            "content": [
+                {"type": "text", "text": SYSTEM_PROMPT_PREFIX, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": suffix}
+            ]
+        }
+    
+    return {"role": "system", "content": SYSTEM_PROMPT_PREFIX + suffix}
 
 
 def get_user_prompt(round_number: int) -> str:
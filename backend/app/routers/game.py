@@ -1,72 +1,274 @@
-from fastapi import APIRouter, HTTPException
-from datetime import date
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from datetime import date, datetime, time, timedelta
+import asyncio
+import json
 import traceback
+from typing import AsyncIterator, Awaitable, Callable
 from app.models import PlayTurnRequest, PlayTurnResponse, DailyInfoResponse, ModelDialogue
-from app.services.game_engine import get_today_setup, create_daily_setup
-from app.services.cache_service import compute_state_hash, get_cached_state, save_game_state
-from app.services.ai_service import generate_all_responses
+from app.services.game_engine import get_today_setup, generate_state, generate_first_round, warm_setup
+from app.services.cache_service import compute_state_hash, get_cached_state, get_state_cache_stats
+from app.services.ai_service import get_circuit_states
+from app.services.response_cache import get_response_cache
+from app.services.response_parser import get_parse_stats
+from app.services.shared_cache import get_shared_cache
+from app.services.state_writer import get_state_writer
+from app.services.transitions import get_transition_table
+from app.startup import get_startup_report
+from app.tracing import get_request_id, span
 
 router = APIRouter(prefix="/api", tags=["game"])
 
 
-@router.get("/daily")
-async def get_daily_info():
-    """Get today's game setup and first round."""
+async def _load_daily_setup() -> dict:
+    # Joins the startup warm-up if it is still creating today's setup
+    setup = await warm_setup()
+    
+    if not setup:
+        raise HTTPException(status_code=500, detail="Could not create daily setup")
+    
+    return setup
+
+
+def _daily_response(setup: dict, initial_hash: str, dialogues: list) -> dict:
+    return {
+        "date": setup["date"],
+        "category": setup.get("category", "Bilinmiyor"),
+        "turn_order": setup["turn_order"],
+        "initial_state_hash": initial_hash,
+        "round_number": 1,
+        "dialogues": dialogues
+    }
+
+
+async def _resolve_turn(request: PlayTurnRequest) -> tuple[dict, date, dict, str | None]:
+    """Validate a move and work out which state it leads to.
+    
+    Also returns the current state's key, or None if the hash is not one of
+    today's states.
+    """
     
+    setup = await get_today_setup()
+    if not setup:
+        raise HTTPException(status_code=404, detail="Today's game not available")
+    
+    today = date.today()
+    table = get_transition_table(setup, today)
+    
+    # Compact keys and legacy MD5 hashes both resolve
+    current_key = table.resolve(request.current_state_hash) if request.current_state_hash else None
+    
+    # Validate action; if state not found, just use defaults (round 1, all models)
     try:
-        setup = get_today_setup()
+        with span("turn.apply_action", action=request.action, target=request.target_model):
+            transition = table.next(current_key or table.root, request.action, request.target_model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return setup, today, transition, current_key
+
+
+async def _saved_state(setup: dict, game_date: date, state_hash: str | None) -> dict | None:
+    """A saved state of the day's game, including one stored under its legacy MD5 key."""
+    
+    if not state_hash:
+        return None
+    return await get_transition_table(setup, game_date).get_state(state_hash)
+
+
+def _turn_response(transition: dict, state: dict) -> dict:
+    return {
+        "state_hash": transition["state_hash"],
+        "round_number": transition["round_number"],
+        "remaining_models": transition["remaining_models"],
+        "dialogues": state.get("dialogues", []),
+        "game_over": state.get("game_over", transition["game_over"]),
+        "winner": state.get("winner", transition["winner"]),
+        "can_pass": False,
+        "eliminated_model": transition["eliminated_model"]
+    }
+
+
+def _state_response(state: dict) -> dict:
+    """A stored state in the same shape as a play_turn response."""
+    
+    return {
+        "state_hash": state["state_hash"],
+        "round_number": state["round_number"],
+        "remaining_models": state["remaining_models"],
+        "dialogues": state.get("dialogues", []),
+        "game_over": state.get("game_over", False),
+        "winner": state.get("winner"),
+        "can_pass": state.get("action") == "START",
+        "eliminated_model": state.get("eliminated_model")
+    }
+
+
+def _state_cache_headers(state_hash: str, game_date: date) -> dict:
+    """Headers for a state, which never changes once its hash exists.
+    
+    The hash is the strong ETag. Shared caches may keep the response until
+    the state's game day is over; states from past days get a day.
+    """
+    
+    rollover = datetime.combine(game_date + timedelta(days=1), time.min)
+    max_age = int((rollover - datetime.now()).total_seconds())
+    if max_age <= 0:
+        max_age = 86400
+    
+    return {
+        "ETag": f'"{state_hash}"',
+        "Cache-Control": f"public, max-age={max_age}, immutable"
+    }
+
+
+def _etag_matches(request: Request, state_hash: str) -> bool:
+    # "*" is not honored: it would answer 304 for hashes that were never stored
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return f'"{state_hash}"' in tags
+
+
+def _not_modified(state_hash: str, game_date: date) -> Response:
+    return Response(status_code=304, headers=_state_cache_headers(state_hash, game_date))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _stream_state(
+    meta: dict,
+    state: dict | None,
+    generate: Callable[[Callable[[dict], None]], Awaitable[dict]],
+    finish: Callable[[dict], dict],
+    order: list[str],
+    ordered: bool
+) -> AsyncIterator[str]:
+    """Stream a state as Server-Sent Events.
+    
+    Emits a `state` event with the metadata, one `dialogue` event per model
+    as soon as it is available (in `order` when `ordered` is set), then a
+    `done` event with the full response once the state has been saved.
+    """
+    
+    yield _sse("state", meta)
+    
+    emitted = set()
+    
+    if state is None:
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        # Run generation as its own task so a client disconnect doesn't stop it being saved
+        task = asyncio.create_task(generate(queue.put_nowait))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
         
-        if not setup:
-            print("Creating new daily setup...")
-            await create_daily_setup()
-            setup = get_today_setup()
+        pending = {}
+        next_index = 0
         
-        if not setup:
-            raise HTTPException(status_code=500, detail="Could not create daily setup")
+        while (dialogue := await queue.get()) is not None:
+            if not ordered:
+                emitted.add(dialogue["model_name"])
+                yield _sse("dialogue", dialogue)
+                continue
+            
+            pending[dialogue["model_name"]] = dialogue
+            while next_index < len(order) and order[next_index] in pending:
+                emitted.add(order[next_index])
+                yield _sse("dialogue", pending.pop(order[next_index]))
+                next_index += 1
+        
+        try:
+            state = task.result()
+        except Exception as e:
+            print(f"Error streaming state [{get_request_id()}]: {str(e)}")
+            print(traceback.format_exc())
+            yield _sse("error", {"detail": str(e)})
+            return
+    
+    # Cached states, or generations another request was already running
+    for dialogue in state.get("dialogues", []):
+        if dialogue["model_name"] not in emitted:
+            yield _sse("dialogue", dialogue)
+    
+    yield _sse("done", finish(state))
+
+
+def _event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/daily")
+async def get_daily_info(request: Request):
+    """Get today's game setup and first round.
+    
+    The URL's content changes at midnight, so it is revalidated on every use
+    (ETag is the initial state hash) rather than cached outright.
+    """
+    
+    try:
+        setup = await _load_daily_setup()
         
         today = date.today()
         initial_hash = compute_state_hash(today, 1, setup["turn_order"], "START")
-        cached = get_cached_state(initial_hash)
+        revalidate = {"ETag": f'"{initial_hash}"', "Cache-Control": "no-cache"}
+        
+        if _etag_matches(request, initial_hash):
+            return Response(status_code=304, headers=revalidate)
+        
+        cached = await _saved_state(setup, today, initial_hash)
         
         # If no cached dialogues, generate them now
         if not cached or not cached.get("dialogues"):
             print("Generating first round dialogues...")
-            
-            dialogues_data = await generate_all_responses(
-                models=setup["turn_order"],
-                mole_model=setup["mole_model"],
-                innocent_word=setup["innocent_word"],
-                mole_word=setup["mole_word"],
-                category=setup["category"],
-                round_number=1
-            )
-            
-            save_game_state(
-                state_hash=initial_hash,
-                game_date=today,
-                round_number=1,
-                remaining_models=setup["turn_order"],
-                action="START",
-                dialogues=dialogues_data
-            )
-            
-            cached = get_cached_state(initial_hash)
+            cached = await generate_first_round(setup, game_date=today)
         
         dialogues = cached.get("dialogues", []) if cached else []
         
-        return {
-            "date": setup["date"],
-            "category": setup.get("category", "Bilinmiyor"),
-            "turn_order": setup["turn_order"],
-            "initial_state_hash": initial_hash,
-            "round_number": 1,
-            "dialogues": dialogues
-        }
+        return JSONResponse(_daily_response(setup, initial_hash, dialogues), headers=revalidate)
+        
+    except Exception as e:
+        print(f"Error in get_daily_info [{get_request_id()}]: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/daily/stream")
+async def stream_daily_info(ordered: bool = False):
+    """Stream today's first round as Server-Sent Events."""
+    
+    try:
+        setup = await _load_daily_setup()
+        
+        today = date.today()
+        initial_hash = compute_state_hash(today, 1, setup["turn_order"], "START")
+        cached = await _saved_state(setup, today, initial_hash)
+        
+        if cached and not cached.get("dialogues"):
+            cached = None
         
     except Exception as e:
-        print(f"Error in get_daily_info: {str(e)}")
+        print(f"Error in stream_daily_info [{get_request_id()}]: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
+    
+    meta = _daily_response(setup, initial_hash, [])
+    del meta["dialogues"]
+    
+    return _event_stream(_stream_state(
+        meta,
+        cached,
+        lambda on_dialogue: generate_first_round(setup, game_date=today, on_dialogue=on_dialogue),
+        lambda state: _daily_response(setup, initial_hash, state.get("dialogues", [])),
+        setup["turn_order"],
+        ordered
+    ))
 
 
 @router.post("/play_turn")
@@ -74,128 +276,115 @@ async def play_turn(request: PlayTurnRequest):
     """Play a turn - PASS or ELIMINATE a model."""
     
     try:
-        setup = get_today_setup()
-        if not setup:
-            raise HTTPException(status_code=404, detail="Today's game not available")
+        setup, today, transition, current_key = await _resolve_turn(request)
         
-        today = date.today()
+        # Check cache
+        state = await _saved_state(setup, today, transition["state_hash"])
         
-        # Get current state - be flexible with state hash
-        current_round = 1
-        remaining_models = setup["turn_order"]
-        
-        if request.current_state_hash:
-            current_state = get_cached_state(request.current_state_hash)
-            if current_state:
-                current_round = current_state["round_number"]
-                remaining_models = current_state["remaining_models"]
-            # If state not found, just use defaults (round 1, all models)
-        
-        # Validate action
-        if request.action == "PASS":
-            if current_round != 1:
-                raise HTTPException(status_code=400, detail="PASS only allowed in round 1")
-            
-            new_round = 2
-            new_remaining = remaining_models
-            eliminated = None
-            
-        elif request.action == "ELIMINATE":
-            if not request.target_model:
-                raise HTTPException(status_code=400, detail="target_model required")
-            
-            if request.target_model not in remaining_models:
-                raise HTTPException(status_code=400, detail=f"Invalid target model: {request.target_model}")
-            
-            new_remaining = [m for m in remaining_models if m != request.target_model]
-            eliminated = request.target_model
-            
-            # Check game over BEFORE incrementing round
-            if request.target_model == setup["mole_model"]:
-                # User found the mole - show current round
-                game_over = True
-                winner = "USER"
-                new_round = current_round  # Don't increment
-            elif len(new_remaining) <= 2:
-                # Mole survived - show current round
-                game_over = True
-                winner = "MOLE"
-                new_round = current_round  # Don't increment
-            else:
-                # Game continues - increment round
-                game_over = False
-                winner = None
-                new_round = current_round + 1
-            
-        else:
-            raise HTTPException(status_code=400, detail="Invalid action")
+        if not state:
+            current_state = await _saved_state(setup, today, current_key)
+            state = await generate_state(setup, today, transition, current_state)
         
-        # Compute new state hash
-        new_hash = compute_state_hash(today, new_round, new_remaining, request.action, eliminated)
+        return _turn_response(transition, state)
         
-        # Check cache
-        cached = get_cached_state(new_hash)
-        
-        if cached:
-            return {
-                "state_hash": new_hash,
-                "round_number": new_round,
-                "remaining_models": new_remaining,
-                "dialogues": cached.get("dialogues", []),
-                "game_over": cached.get("game_over", False),
-                "winner": cached.get("winner"),
-                "can_pass": False,
-                "eliminated_model": eliminated
-            }
-        
-        # Generate new dialogues if game not over
-        if game_over:
-            dialogues_data = []
-        else:
-            previous_dialogues = []
-            if request.current_state_hash:
-                prev_state = get_cached_state(request.current_state_hash)
-                if prev_state:
-                    previous_dialogues = prev_state.get("dialogues", [])
-            
-            dialogues_data = await generate_all_responses(
-                models=new_remaining,
-                mole_model=setup["mole_model"],
-                innocent_word=setup["innocent_word"],
-                mole_word=setup["mole_word"],
-                category=setup["category"],
-                round_number=new_round,
-                previous_dialogues=previous_dialogues
-            )
-        
-        # Save to cache
-        save_game_state(
-            state_hash=new_hash,
-            game_date=today,
-            round_number=new_round,
-            remaining_models=new_remaining,
-            action=request.action,
-            dialogues=dialogues_data,
-            game_over=game_over,
-            winner=winner,
-            eliminated_model=eliminated
-        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in play_turn [{get_request_id()}]: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/play_turn/stream")
+async def stream_play_turn(request: PlayTurnRequest, ordered: bool = False):
+    """Play a turn and stream each model's dialogue as Server-Sent Events."""
+    
+    try:
+        setup, today, transition, current_key = await _resolve_turn(request)
         
-        return {
-            "state_hash": new_hash,
-            "round_number": new_round,
-            "remaining_models": new_remaining,
-            "dialogues": dialogues_data,
-            "game_over": game_over,
-            "winner": winner,
-            "can_pass": False,
-            "eliminated_model": eliminated
-        }
+        state = await _saved_state(setup, today, transition["state_hash"])
+        current_state = None if state else await _saved_state(setup, today, current_key)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in play_turn: {str(e)}")
+        print(f"Error in stream_play_turn [{get_request_id()}]: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    meta = _turn_response(transition, {})
+    del meta["dialogues"]
+    
+    return _event_stream(_stream_state(
+        meta,
+        state,
+        lambda on_dialogue: generate_state(setup, today, transition, current_state, on_dialogue),
+        lambda saved: _turn_response(transition, saved),
+        transition["remaining_models"],
+        ordered
+    ))
+
+
+@router.get("/state/{state_hash}")
+async def get_state(state_hash: str, request: Request):
+    """Get a saved state by hash; cacheable by browsers and CDNs."""
+    
+    # Content-addressed: a client holding the hash as ETag already has the body
+    if _etag_matches(request, state_hash):
+        return _not_modified(state_hash, date.today())
+    
+    try:
+        state = await get_cached_state(state_hash)
+        
+        if not state:
+            setup = await get_today_setup()
+            if setup:
+                state = await _saved_state(setup, date.today(), state_hash)
+    except Exception as e:
+        print(f"Error in get_state [{get_request_id()}]: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not state:
+        raise HTTPException(status_code=404, detail="State not found")
+    
+    return JSONResponse(
+        _state_response(state),
+        headers=_state_cache_headers(state_hash, date.fromisoformat(state["date"]))
+    )
+
+
+@router.get("/state/{state_hash}/next")
+async def get_next_state(state_hash: str, request: Request, action: str, target: str = None):
+    """GET form of play_turn from a known state, so the result can be cached.
+    
+    Generates the next state on first use, exactly like POST /play_turn.
+    """
+    
+    try:
+        turn = PlayTurnRequest(action=action, target_model=target, current_state_hash=state_hash)
+        setup, today, transition, current_key = await _resolve_turn(turn)
+        
+        if not current_key:
+            raise HTTPException(status_code=404, detail="State not found")
+        
+        if _etag_matches(request, transition["state_hash"]):
+            return _not_modified(transition["state_hash"], today)
+        
+        state = await _saved_state(setup, today, transition["state_hash"])
+        if not state:
+            current_state = await _saved_state(setup, today, current_key)
+            state = await generate_state(setup, today, transition, current_state)
+        
+        return JSONResponse(
+            _turn_response(transition, state),
+            headers=_state_cache_headers(transition["state_hash"], today)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_next_state [{get_request_id()}]: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -208,8 +397,28 @@ async def health_check():
         settings = get_settings()
         return {
             "status": "healthy",
+            "storage_backend": settings.storage_backend,
             "supabase_configured": bool(settings.supabase_url and "supabase" in settings.supabase_url),
-            "openrouter_configured": bool(settings.openrouter_api_key and len(settings.openrouter_api_key) > 10)
+            "openrouter_configured": bool(settings.openrouter_api_key and len(settings.openrouter_api_key) > 10),
+            "startup": get_startup_report(),
+            "state_cache": get_state_cache_stats(),
+            "shared_cache": get_shared_cache().stats(),
+            "state_writer": writer.stats() if (writer := get_state_writer()) else None,
+            "llm_circuits": get_circuit_states(),
+            "llm_parsing": get_parse_stats(),
+            "llm_response_cache": get_response_cache().stats()
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until startup warm-up has finished, then 200.
+    
+    The body has per-phase startup timings; "degraded" means a warm-up step
+    failed and its work will happen on demand.
+    """
+    
+    report = get_startup_report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
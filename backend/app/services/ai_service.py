@@ -1,85 +1,328 @@
-import httpx
-import json
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
 from app.config import get_settings
-from app.prompts import OPENROUTER_MODELS, get_system_prompt, get_user_prompt
+from app.metrics import (
+    AI_RESPONSE_SECONDS,
+    LLM_IN_FLIGHT,
+    LLM_REQUEST_SECONDS,
+    LLM_ROUND_SECONDS,
+    LLM_TOKENS
+)
+from app.prompts import (
+    FALLBACK_MODELS,
+    MODEL_LATENCY_BUDGETS,
+    JSON_MODE_ROUTE_PREFIXES,
+    OPENROUTER_MODELS,
+    SYSTEM_PROMPT_PREFIX,
+    build_system_message,
+    get_system_prompt_suffix,
+    get_user_prompt
+)
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.llm_providers import get_llm_provider
+from app.services.response_cache import get_response_cache, response_key
+from app.services.response_parser import RAW, parse_reply, record_parse
+from app.tracing import span
 
 settings = get_settings()
 
+# Sampling temperature for every upstream call; part of the response cache key
+TEMPERATURE = 0.8
+
+# Global in-flight cap plus one semaphore per upstream model
+_global_semaphore: asyncio.Semaphore | None = None
+_model_semaphores: dict[str, asyncio.Semaphore] = {}
+
+# Recent successful call latencies per upstream model, used to place the hedge
+_latencies: dict[str, deque] = {}
+LATENCY_WINDOW = 200
+
+# One circuit breaker per upstream route (primary and fallback routes alike)
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def _get_global_semaphore() -> asyncio.Semaphore:
+    global _global_semaphore
+    if _global_semaphore is None:
+        _global_semaphore = asyncio.Semaphore(settings.llm_max_in_flight)
+    return _global_semaphore
+
+
+def _get_model_semaphore(openrouter_model: str) -> asyncio.Semaphore:
+    semaphore = _model_semaphores.get(openrouter_model)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.llm_per_model_concurrency)
+        _model_semaphores[openrouter_model] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def _upstream_slot(openrouter_model: str):
+    """Queue behind the per-model and global limits for one upstream call."""
+    
+    async with _get_model_semaphore(openrouter_model):
+        async with _get_global_semaphore():
+            yield
+
+
+def record_latency(openrouter_model: str, seconds: float):
+    _latencies.setdefault(openrouter_model, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def observed_p95(openrouter_model: str) -> float | None:
+    samples = _latencies.get(openrouter_model)
+    if not samples or len(samples) < settings.llm_hedge_min_samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+
+def get_latency_budget(model_name: str) -> float:
+    """p95 latency after which a hedged request is sent for this model."""
+    
+    observed = observed_p95(OPENROUTER_MODELS[model_name])
+    if observed is not None:
+        return observed
+    return settings.llm_latency_budgets.get(model_name, MODEL_LATENCY_BUDGETS.get(model_name, 10.0))
+
+
+def get_fallback_model(model_name: str) -> str | None:
+    return settings.llm_fallback_models.get(model_name, FALLBACK_MODELS.get(model_name))
+
+
+def get_breaker(openrouter_model: str) -> CircuitBreaker:
+    breaker = _breakers.get(openrouter_model)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            openrouter_model,
+            window=settings.circuit_window_seconds,
+            min_requests=settings.circuit_min_requests,
+            error_rate_threshold=settings.circuit_error_rate_threshold,
+            latency_threshold=settings.circuit_latency_threshold,
+            open_seconds=settings.circuit_open_seconds,
+            half_open_probes=settings.circuit_half_open_probes
+        )
+        _breakers[openrouter_model] = breaker
+    return breaker
+
+
+def get_circuit_states() -> dict:
+    """Circuit breaker state and health score per upstream model."""
+    
+    routes = list(OPENROUTER_MODELS.values()) + [r for r in _breakers if r not in OPENROUTER_MODELS.values()]
+    return {route: get_breaker(route).snapshot() for route in routes}
+
+
+async def _request_completion(
+    openrouter_model: str,
+    system_suffix: str,
+    user_prompt: str,
+    acquired: asyncio.Event = None
+) -> str:
+    """Call one upstream model and return the raw message content.
+    
+    The system prompt is the shared static prefix plus `system_suffix`.
+    Time spent queueing for a slot is not counted towards the timeout, the
+    circuit breaker or the latency samples, which describe the upstream only.
+    `acquired` is set once the call holds its slot.
+    """
+    
+    payload = {
+        "model": openrouter_model,
+        "messages": [
+            build_system_message(openrouter_model, system_suffix, settings.llm_prompt_caching),
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": TEMPERATURE,
+        "max_tokens": 300
+    }
+    if settings.llm_json_mode and openrouter_model.startswith(JSON_MODE_ROUTE_PREFIXES):
+        payload["response_format"] = {"type": "json_object"}
+    
+    queued = time.monotonic()
+    
+    async with _upstream_slot(openrouter_model):
+        if acquired is not None:
+            acquired.set()
+        breaker = get_breaker(openrouter_model)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for {openrouter_model}")
+        
+        started = time.monotonic()
+        LLM_IN_FLIGHT.inc(model=openrouter_model)
+        
+        try:
+            with span("llm.request", route=openrouter_model, queued_seconds=round(started - queued, 4)) as request_span:
+                result = await asyncio.wait_for(
+                    get_llm_provider().chat_completion(payload),
+                    timeout=settings.llm_model_timeout
+                )
+            
+                content = result["choices"][0]["message"]["content"]
+                request_span.set_attribute("total_tokens", (result.get("usage") or {}).get("total_tokens"))
+        except asyncio.CancelledError:
+            # Lost a hedge race or the round ended; says nothing about upstream health
+            breaker.release()
+            LLM_REQUEST_SECONDS.observe(time.monotonic() - started, model=openrouter_model, outcome="cancelled")
+            raise
+        except Exception as e:
+            latency = time.monotonic() - started
+            breaker.record(False, latency)
+            outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            LLM_REQUEST_SECONDS.observe(latency, model=openrouter_model, outcome=outcome)
+            raise
+        finally:
+            LLM_IN_FLIGHT.dec(model=openrouter_model)
+    
+    latency = time.monotonic() - started
+    breaker.record(True, latency)
+    record_latency(openrouter_model, latency)
+    LLM_REQUEST_SECONDS.observe(latency, model=openrouter_model, outcome="ok")
+    
+    usage = result.get("usage") or {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], model=openrouter_model, type=kind.split("_")[0])
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if cached_tokens:
+        LLM_TOKENS.inc(cached_tokens, model=openrouter_model, type="cached")
+    
+    return content
+
+
+async def _first_success(
+    primary: Callable[[asyncio.Event], Awaitable],
+    backup: Callable[[], Awaitable] | None,
+    hedge_delay: float
+):
+    """Run `primary`, starting `backup` if it fails or is still running after `hedge_delay`.
+    
+    `primary` is passed an event to set once it holds an upstream slot; the
+    hedge delay counts from then, so local queueing alone never sends a
+    hedged request. Returns the first successful result and cancels the loser.
+    """
+    
+    acquired = asyncio.Event()
+    pending = {asyncio.create_task(primary(acquired))}
+    backup_started = backup is None
+    error = None
+    
+    try:
+        if not backup_started:
+            waiter = asyncio.create_task(acquired.wait())
+            await asyncio.wait(pending | {waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+        
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if backup_started else hedge_delay,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            
+            # Primary is slow or failed: send the hedged request
+            if not backup_started:
+                pending.add(asyncio.create_task(backup()))
+                backup_started = True
+        
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
 
 async def generate_ai_response(
     model_name: str,
     assigned_word: str,
     category: str,
     round_number: int,
-    previous_dialogues: list = None
+    history: str = None
 ) -> dict:
-    """Generate AI response using OpenRouter API."""
+    """Generate AI response using the configured LLM provider (OpenRouter by default).
+    
+    Identical calls are answered from the response cache. Otherwise sends a
+    hedged request to the fallback route once the call runs past the model's
+    latency budget, or right away if the primary fails.
+    """
     
     openrouter_model = OPENROUTER_MODELS.get(model_name)
     if not openrouter_model:
         raise ValueError(f"Unknown model: {model_name}")
     
-    system_prompt = get_system_prompt(
+    system_suffix = get_system_prompt_suffix(
         model_name=model_name,
         assigned_word=assigned_word,
         category=category,
         round_number=round_number,
-        previous_dialogues=previous_dialogues
+        history=history or ""
     )
     
     user_prompt = get_user_prompt(round_number)
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {settings.openrouter_api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://ai-mole-game.vercel.app",
-                "X-Title": "AI Mole Game"
-            },
-            json={
-                "model": openrouter_model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.8,
-                "max_tokens": 300
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"OpenRouter API error: {response.text}")
-        
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
+    # Keyed on the player's primary route, whichever route ends up answering
+    cache = get_response_cache()
+    cache_key = response_key(openrouter_model, SYSTEM_PROMPT_PREFIX + system_suffix, user_prompt, TEMPERATURE)
+    cached = await cache.get(cache_key)
+    
+    fallback_model = get_fallback_model(model_name)
+    primary_allowed = get_breaker(openrouter_model).is_available()
+    fallback_allowed = bool(fallback_model) and get_breaker(fallback_model).is_available()
+    
+    async def primary(acquired: asyncio.Event = None):
+        return await _request_completion(openrouter_model, system_suffix, user_prompt, acquired)
+    
+    async def backup():
+        return await _request_completion(fallback_model or openrouter_model, system_suffix, user_prompt)
+    
+    if cached is not None:
+        content = cached
+    elif primary_allowed:
+        # Only hedge to the fallback while its own circuit is closed
+        if fallback_model:
+            hedge = backup if fallback_allowed else None
+        else:
+            hedge = backup if settings.llm_hedging_enabled else None
         
-        # Parse JSON response
-        try:
-            # Clean up response if needed
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            parsed = json.loads(content)
-            return {
-                "model_name": model_name,
-                "message": parsed.get("message", content),
-                "internal_thought": parsed.get("internal_thought", "")
-            }
-        except json.JSONDecodeError:
-            # If JSON parsing fails, use raw content
-            return {
-                "model_name": model_name,
-                "message": content[:200],
-                "internal_thought": "JSON parse hatası"
-            }
+        # Each upstream attempt has its own timeout, started once it holds a slot;
+        # the round deadline bounds the call as a whole
+        content = await _first_success(
+            primary,
+            hedge,
+            get_latency_budget(model_name) if settings.llm_hedging_enabled else settings.llm_model_timeout
+        )
+    elif fallback_allowed:
+        # Primary circuit is open: fail over straight to the fallback route
+        content = await backup()
+    else:
+        raise CircuitOpenError(f"Circuit open for {openrouter_model}")
+    
+    with span("llm.parse", model=model_name) as parse_span:
+        fields, status = parse_reply(content)
+        truncated = fields.pop("truncated")
+        record_parse(model_name, status, truncated)
+        parse_span.set_attribute("status", status)
+    
+    # Don't keep replies with no usable JSON; the next identical call gets another try
+    if cached is None and status != RAW:
+        await cache.set(cache_key, openrouter_model, content)
+    
+    return {"model_name": model_name, **fields}
+
+
+def _failed_dialogue(model_name: str, error: Exception) -> dict:
+    return {
+        "model_name": model_name,
+        "message": "Bu tur için yanıt üretilemedi.",
+        "internal_thought": str(error)
+    }
 
 
 async def generate_all_responses(
@@ -89,39 +332,64 @@ async def generate_all_responses(
     mole_word: str,
     category: str,
     round_number: int,
-    previous_dialogues: list = None
+    history: str = None,
+    on_dialogue: Callable[[dict], None] = None
 ) -> list[dict]:
-    """Generate responses for all models in parallel."""
+    """Generate responses for all models in parallel.
     
-    import asyncio
+    `history` is the prompt block from services.history, built once and
+    shared by every model. `on_dialogue` is called with each dialogue as soon as its model finishes,
+    so callers can stream results before the slowest model is done.
+    """
     
-    tasks = []
-    for model in models:
+    async def respond(model: str) -> dict:
         # Mole gets the mole word, others get innocent word
         word = mole_word if model == mole_model else innocent_word
+        started = time.monotonic()
+        outcome = "ok"
         
-        tasks.append(
-            generate_ai_response(
-                model_name=model,
-                assigned_word=word,
-                category=category,
-                round_number=round_number,
-                previous_dialogues=previous_dialogues
-            )
-        )
+        try:
+            with span("llm.response", model=model, round_number=round_number):
+                dialogue = await generate_ai_response(
+                    model_name=model,
+                    assigned_word=word,
+                    category=category,
+                    round_number=round_number,
+                    history=history
+                )
+        except asyncio.CancelledError:
+            AI_RESPONSE_SECONDS.observe(time.monotonic() - started, model=model, outcome="deadline")
+            raise
+        except Exception as e:
+            outcome = "error"
+            dialogue = _failed_dialogue(model, e)
+        
+        AI_RESPONSE_SECONDS.observe(time.monotonic() - started, model=model, outcome=outcome)
+        
+        if on_dialogue is not None:
+            on_dialogue(dialogue)
+        
+        return dialogue
     
-    responses = await asyncio.gather(*tasks, return_exceptions=True)
+    round_started = time.monotonic()
+    
+    with span("llm.round", round_number=round_number, models=len(models)) as round_span:
+        tasks = [asyncio.create_task(respond(model)) for model in models]
+        
+        # Hard per-round deadline: whatever hasn't answered by then gets the placeholder
+        done, pending = await asyncio.wait(tasks, timeout=settings.llm_round_deadline)
+        round_span.set_attribute("timed_out", len(pending))
+    LLM_ROUND_SECONDS.observe(time.monotonic() - round_started)
     
-    # Handle any exceptions
     dialogues = []
-    for i, resp in enumerate(responses):
-        if isinstance(resp, Exception):
-            dialogues.append({
-                "model_name": models[i],
-                "message": "Bu tur için yanıt üretilemedi.",
-                "internal_thought": str(resp)
-            })
+    for model, task in zip(models, tasks):
+        if task in done:
+            dialogues.append(task.result())
         else:
-            dialogues.append(resp)
+            task.cancel()
+            dialogue = _failed_dialogue(model, TimeoutError("round deadline exceeded"))
+            if on_dialogue is not None:
+                on_dialogue(dialogue)
+            dialogues.append(dialogue)
     
     return dialogues
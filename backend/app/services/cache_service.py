@@ -1,6 +1,24 @@
 import hashlib
+import time
 from datetime import date
-from app.database import get_db
+from app.config import get_settings
+from app.metrics import STATE_CACHE_LOOKUPS, STATE_LOOKUP_SECONDS, STATE_SAVE_SECONDS
+from app.storage import get_storage
+from app.services.lru_cache import LRUCache
+from app.services.shared_cache import get_shared_cache
+from app.services.state_codec import state_key
+from app.services.state_writer import get_state_writer
+from app.tracing import span
+
+settings = get_settings()
+
+# States are immutable once saved, so rows can be served from memory until the day rolls over
+_state_cache = LRUCache(
+    max_entries=settings.state_cache_max_entries,
+    max_bytes=settings.state_cache_max_bytes,
+    ttl=settings.state_cache_ttl
+)
+_cache_day: date | None = None
 
 
 def compute_state_hash(
@@ -10,7 +28,22 @@ def compute_state_hash(
     action: str,
     eliminated_model: str = None
 ) -> str:
-    """Compute MD5 hash for game state."""
+    """Key for a game state, in the configured state_key_format."""
+    
+    if settings.state_key_format == "md5":
+        return compute_legacy_state_hash(game_date, round_number, remaining_models, action, eliminated_model)
+    
+    return state_key(game_date, round_number, remaining_models, action, eliminated_model)
+
+
+def compute_legacy_state_hash(
+    game_date: date,
+    round_number: int,
+    remaining_models: list[str],
+    action: str,
+    eliminated_model: str = None
+) -> str:
+    """Compute MD5 hash for game state, as keys were before compact keys."""
     
     # Sort models for consistent hashing
     sorted_models = sorted(remaining_models)
@@ -20,20 +53,78 @@ def compute_state_hash(
     return hashlib.md5(hash_input.encode()).hexdigest()
 
 
-def get_cached_state(state_hash: str) -> dict | None:
-    """Get cached game state from Supabase."""
+def _roll_over_cache():
+    """Evict states from previous days once the daily game changes."""
+    
+    global _cache_day
+    today = date.today()
+    if _cache_day != today:
+        today_iso = today.isoformat()
+        _state_cache.evict_where(lambda state: state.get("date", today_iso) < today_iso)
+        _cache_day = today
+
+
+def remember_state(state: dict, state_hash: str = None):
+    """Put a saved state row into the in-process cache, under `state_hash` if given."""
+    
+    _roll_over_cache()
+    _state_cache.set(state_hash or state["state_hash"], state)
+
+
+def get_state_cache_stats() -> dict:
+    return _state_cache.stats()
+
+
+async def get_cached_state(state_hash: str) -> dict | None:
+    """Get cached game state from memory, then the shared tier, falling back to storage."""
     
-    db = get_db()
+    _roll_over_cache()
     
-    result = db.table("game_states").select("*").eq("state_hash", state_hash).execute()
+    started = time.perf_counter()
     
-    if result.data and len(result.data) > 0:
-        return result.data[0]
+    with span("cache.get_state", state_hash=state_hash) as lookup_span:
+        cached = _state_cache.get(state_hash)
+        if cached is not None:
+            STATE_CACHE_LOOKUPS.inc(tier="memory", result="hit")
+            STATE_LOOKUP_SECONDS.observe(time.perf_counter() - started, source="memory")
+            lookup_span.set_attribute("source", "memory")
+            return cached
+        
+        STATE_CACHE_LOOKUPS.inc(tier="memory", result="miss")
+        
+        # Evicted from memory before the write-behind queue stored it
+        writer = get_state_writer()
+        pending = writer.pending.get(state_hash) if writer else None
+        if pending is not None:
+            STATE_LOOKUP_SECONDS.observe(time.perf_counter() - started, source="pending")
+            lookup_span.set_attribute("source", "pending")
+            remember_state(pending)
+            return pending
+        
+        shared = get_shared_cache()
+        if shared.name != "none":
+            state = await shared.get("state", state_hash)
+            STATE_CACHE_LOOKUPS.inc(tier="shared", result="hit" if state else "miss")
+            if state is not None:
+                STATE_LOOKUP_SECONDS.observe(time.perf_counter() - started, source="shared")
+                lookup_span.set_attribute("source", "shared")
+                remember_state(state)
+                return state
+        
+        state = await get_storage().get_game_state(state_hash)
+        STATE_CACHE_LOOKUPS.inc(tier="storage", result="hit" if state else "miss")
+        STATE_LOOKUP_SECONDS.observe(time.perf_counter() - started, source="storage")
+        lookup_span.set_attribute("source", "storage" if state else "miss")
+    
+    if state:
+        remember_state(state)
+        await shared.set("state", state_hash, state)
+        return state
     
     return None
 
 
-def save_game_state(
+def build_state_row(
     state_hash: str,
     game_date: date,
     round_number: int,
@@ -42,13 +133,10 @@ def save_game_state(
     dialogues: list[dict],
     game_over: bool = False,
     winner: str = None,
-    eliminated_model: str = None
+    eliminated_model: str = None,
+    parent_hash: str = None
 ) -> dict:
-    """Save game state to Supabase."""
-    
-    db = get_db()
-    
-    data = {
+    return {
         "state_hash": state_hash,
         "date": game_date.isoformat(),
         "round_number": round_number,
@@ -57,9 +145,59 @@ def save_game_state(
         "eliminated_model": eliminated_model,
         "dialogues": dialogues,
         "game_over": game_over,
-        "winner": winner
+        "winner": winner,
+        "parent_hash": parent_hash
     }
+
+
+async def save_game_state(
+    state_hash: str,
+    game_date: date,
+    round_number: int,
+    remaining_models: list[str],
+    action: str,
+    dialogues: list[dict],
+    game_over: bool = False,
+    winner: str = None,
+    eliminated_model: str = None,
+    parent_hash: str = None
+) -> dict:
+    """Save game state to storage, idempotent on state_hash.
     
-    result = db.table("game_states").insert(data).execute()
+    `parent_hash` is the state the dialogues were generated from, which lets
+    the prompt history be rebuilt across rounds. With the write-behind queue
+    running, the row is visible to lookups at once and stored shortly after.
+    """
     
-    return result.data[0] if result.data else data
+    data = build_state_row(
+        state_hash=state_hash,
+        game_date=game_date,
+        round_number=round_number,
+        remaining_models=remaining_models,
+        action=action,
+        dialogues=dialogues,
+        game_over=game_over,
+        winner=winner,
+        eliminated_model=eliminated_model,
+        parent_hash=parent_hash
+    )
+    
+    writer = get_state_writer()
+    if writer is not None:
+        remember_state(data)
+        await get_shared_cache().set("state", state_hash, data)
+        writer.enqueue(data)
+        return data
+    
+    with STATE_SAVE_SECONDS.time(), span("cache.save_state", state_hash=state_hash):
+        try:
+            saved = await get_storage().save_game_state(data) or data
+        except Exception as e:
+            # The dialogues are already paid for; serve them from memory regardless
+            print(f"Error saving game state {state_hash}: {str(e)}")
+            saved = data
+    remember_state(saved)
+    await get_shared_cache().set("state", state_hash, saved)
+    
+    return saved
+
@@ -0,0 +1,135 @@
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for a single upstream.
+
+    Opens when the error rate or the p95 latency over the last `window`
+    seconds crosses its threshold, rejects calls for `open_seconds`, then
+    lets `half_open_probes` calls through; a successful probe closes it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 60.0,
+        min_requests: int = 5,
+        error_rate_threshold: float = 0.5,
+        latency_threshold: float = 15.0,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_threshold = latency_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.times_opened = 0
+        self._outcomes: deque[tuple[float, bool, float]] = deque()
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def error_rate(self) -> float:
+        self._trim(time.monotonic())
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    def p95_latency(self) -> float | None:
+        self._trim(time.monotonic())
+        latencies = sorted(latency for _, ok, latency in self._outcomes if ok)
+        if not latencies:
+            return None
+        return latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+
+    def health_score(self) -> float:
+        """1.0 for a healthy upstream, falling towards 0 with errors and slowness."""
+        if self.state == OPEN:
+            return 0.0
+        score = 1.0 - self.error_rate()
+        p95 = self.p95_latency()
+        if p95 is not None and p95 > self.latency_threshold:
+            score *= self.latency_threshold / p95
+        return round(score, 3)
+
+    def is_available(self) -> bool:
+        """Whether a call would currently be let through, without claiming a probe."""
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= self.open_seconds
+        if self.state == HALF_OPEN:
+            return self.probes_in_flight < self.half_open_probes
+        return True
+
+    def allow_request(self) -> bool:
+        """Claim permission for a call; in half-open state this takes a probe slot."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self.probes_in_flight = 0
+
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                return False
+            self.probes_in_flight += 1
+
+        return True
+
+    def release(self):
+        """Give back a half-open probe slot for a call that was cancelled."""
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        print(f"Circuit opened for {self.name}")
+
+    def record(self, ok: bool, latency: float = 0.0):
+        now = time.monotonic()
+        self._outcomes.append((now, ok, latency))
+        self._trim(now)
+
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+            if ok:
+                self.state = CLOSED
+                self._outcomes.clear()
+                print(f"Circuit closed for {self.name}")
+            else:
+                self._open(now)
+            return
+
+        if self.state == CLOSED and len(self._outcomes) >= self.min_requests:
+            p95 = self.p95_latency()
+            if self.error_rate() >= self.error_rate_threshold or (p95 is not None and p95 > self.latency_threshold):
+                self._open(now)
+
+    def snapshot(self) -> dict:
+        p95 = self.p95_latency()
+        return {
+            "state": self.state,
+            "health_score": self.health_score(),
+            "error_rate": round(self.error_rate(), 3),
+            "p95_latency": round(p95, 3) if p95 is not None else None,
+            "requests_in_window": len(self._outcomes),
+            "times_opened": self.times_opened
+        }
@@ -1,23 +1,83 @@
 import random
-from datetime import date, datetime
-from app.database import get_db
+from datetime import date, timedelta
+from typing import Callable
+from app.config import get_settings
+from app.storage import get_storage
 from app.prompts import AI_MODELS
 from app.services.cache_service import compute_state_hash, save_game_state
 from app.services.ai_service import generate_all_responses
+from app.services.history import get_history
+from app.services.lru_cache import LRUCache
+from app.services.shared_cache import get_shared_cache
+from app.services.singleflight import SingleFlight, generate_once
+from app.tracing import span
 
+settings = get_settings()
 
-def get_random_word_pair() -> dict:
-    """Get a random word pair from database."""
+# Daily setups keyed by ISO date; each day's setup never changes once created
+_setup_cache: dict[str, dict] = {}
+_setup_flight = SingleFlight()
+_warm_flight = SingleFlight()
+
+# Lightweight (id, difficulty) index of word_pairs, refreshed every word_pair_index_ttl seconds
+_word_pair_index = LRUCache(max_entries=1, ttl=settings.word_pair_index_ttl)
+
+
+async def _get_word_pair_index() -> list[dict]:
+    index = _word_pair_index.get("word_pairs")
+    if index is None:
+        index = await get_storage().list_word_pair_index()
+        if index:
+            _word_pair_index.set("word_pairs", index)
+    return index
+
+
+async def get_random_word_pair(
+    game_date: date = None,
+    exclude_recent_days: int = None,
+    min_difficulty: int = None,
+    max_difficulty: int = None
+) -> dict:
+    """Get a random word pair from database.
+    
+    Picks from a cached id/difficulty index and fetches only the chosen row,
+    skipping pairs used in the last `exclude_recent_days` days. Filters are
+    relaxed if nothing matches.
+    """
     
-    db = get_db()
+    game_date = game_date or date.today()
+    if exclude_recent_days is None:
+        exclude_recent_days = settings.word_pair_exclude_recent_days
+    if min_difficulty is None:
+        min_difficulty = settings.word_pair_min_difficulty
+    if max_difficulty is None:
+        max_difficulty = settings.word_pair_max_difficulty
     
-    # Get all word pairs and select random
-    result = db.table("word_pairs").select("*").execute()
+    index = await _get_word_pair_index()
     
-    if not result.data:
+    if not index:
         raise Exception("No word pairs found in database")
     
-    return random.choice(result.data)
+    candidates = [
+        pair for pair in index
+        if (min_difficulty is None or pair.get("difficulty", 3) >= min_difficulty)
+        and (max_difficulty is None or pair.get("difficulty", 3) <= max_difficulty)
+    ] or index
+    
+    if exclude_recent_days:
+        recent = await get_storage().get_recent_word_pair_ids(game_date - timedelta(days=exclude_recent_days))
+        candidates = [pair for pair in candidates if pair["id"] not in recent] or candidates
+    
+    chosen = random.choice(candidates)
+    
+    word_pair = await get_storage().get_word_pair(chosen["id"])
+    
+    if not word_pair:
+        # Index is stale (pair deleted); rebuild it next time
+        _word_pair_index.clear()
+        raise Exception(f"Word pair {chosen['id']} not found")
+    
+    return word_pair
 
 
 def select_random_mole() -> str:
@@ -32,19 +92,19 @@ def generate_turn_order() -> list[str]:
     return models
 
 
-async def create_daily_setup() -> dict:
+async def create_daily_setup(game_date: date = None) -> dict:
     """Create daily setup - called by cron job at midnight."""
     
-    db = get_db()
-    today = date.today()
+    storage = get_storage()
+    today = game_date or date.today()
     
     # Check if setup already exists
-    existing = db.table("daily_setup").select("*").eq("date", today.isoformat()).execute()
-    if existing.data and len(existing.data) > 0:
-        return existing.data[0]
+    existing = await storage.get_daily_setup(today)
+    if existing:
+        return existing
     
     # Get random word pair
-    word_pair = get_random_word_pair()
+    word_pair = await get_random_word_pair(today)
     
     # Select random mole and turn order
     mole_model = select_random_mole()
@@ -58,19 +118,30 @@ async def create_daily_setup() -> dict:
         "turn_order": turn_order
     }
     
-    result = db.table("daily_setup").insert(setup_data).execute()
-    setup = result.data[0]
+    setup = await storage.insert_daily_setup(setup_data)
+    if not setup:
+        # Another worker created today's setup first
+        return await storage.get_daily_setup(today)
     
     # Generate first round immediately
-    await generate_first_round(setup, word_pair)
+    await generate_first_round(setup, word_pair, game_date=today)
     
     return setup
 
 
-async def generate_first_round(setup: dict, word_pair: dict):
-    """Generate first round dialogues and cache them."""
+async def generate_first_round(
+    setup: dict,
+    word_pair: dict = None,
+    game_date: date = None,
+    on_dialogue: Callable[[dict], None] = None
+) -> dict:
+    """Generate first round dialogues and cache them.
+    
+    `word_pair` defaults to the words already joined into `setup`.
+    """
     
-    today = date.today()
+    word_pair = word_pair or setup
+    today = game_date or date.today()
     round_number = 1
     remaining_models = setup["turn_order"]
     action = "START"
@@ -78,40 +149,153 @@ async def generate_first_round(setup: dict, word_pair: dict):
     # Compute hash for initial state
     state_hash = compute_state_hash(today, round_number, remaining_models, action)
     
-    # Generate dialogues
-    dialogues = await generate_all_responses(
-        models=remaining_models,
-        mole_model=setup["mole_model"],
-        innocent_word=word_pair["innocent_word"],
-        mole_word=word_pair["mole_word"],
-        category=word_pair["category"],
-        round_number=round_number
-    )
-    
-    # Save to cache
-    save_game_state(
-        state_hash=state_hash,
-        game_date=today,
-        round_number=round_number,
-        remaining_models=remaining_models,
-        action=action,
-        dialogues=dialogues
-    )
-
-
-def get_today_setup() -> dict:
-    """Get today's game setup."""
+    async def generate():
+        # Generate dialogues
+        dialogues = await generate_all_responses(
+            models=remaining_models,
+            mole_model=setup["mole_model"],
+            innocent_word=word_pair["innocent_word"],
+            mole_word=word_pair["mole_word"],
+            category=word_pair["category"],
+            round_number=round_number,
+            on_dialogue=on_dialogue
+        )
+        
+        # Save to cache
+        return await save_game_state(
+            state_hash=state_hash,
+            game_date=today,
+            round_number=round_number,
+            remaining_models=remaining_models,
+            action=action,
+            dialogues=dialogues
+        )
+    
+    with span("state.generate", state_hash=state_hash, round_number=round_number):
+        return await generate_once(state_hash, generate)
+
+
+def apply_action(
+    setup: dict,
+    game_date: date,
+    current_round: int,
+    remaining_models: list[str],
+    action: str,
+    target_model: str = None
+) -> dict:
+    """Resolve a PASS or ELIMINATE move into the next state.
+    
+    Raises ValueError for moves that are not allowed.
+    """
+    
+    if action == "PASS":
+        if current_round != 1:
+            raise ValueError("PASS only allowed in round 1")
+        
+        new_round = 2
+        new_remaining = remaining_models
+        eliminated = None
+        game_over = False
+        winner = None
+        
+    elif action == "ELIMINATE":
+        if not target_model:
+            raise ValueError("target_model required")
+        
+        if target_model not in remaining_models:
+            raise ValueError(f"Invalid target model: {target_model}")
+        
+        new_remaining = [m for m in remaining_models if m != target_model]
+        eliminated = target_model
+        
+        # Check game over BEFORE incrementing round
+        if target_model == setup["mole_model"]:
+            # User found the mole - show current round
+            game_over = True
+            winner = "USER"
+            new_round = current_round  # Don't increment
+        elif len(new_remaining) <= 2:
+            # Mole survived - show current round
+            game_over = True
+            winner = "MOLE"
+            new_round = current_round  # Don't increment
+        else:
+            # Game continues - increment round
+            game_over = False
+            winner = None
+            new_round = current_round + 1
+        
+    else:
+        raise ValueError("Invalid action")
     
-    db = get_db()
-    today = date.today()
+    return {
+        "state_hash": compute_state_hash(game_date, new_round, new_remaining, action, eliminated),
+        "round_number": new_round,
+        "remaining_models": new_remaining,
+        "action": action,
+        "eliminated_model": eliminated,
+        "game_over": game_over,
+        "winner": winner
+    }
+
+
+async def generate_state(
+    setup: dict,
+    game_date: date,
+    transition: dict,
+    parent_state: dict = None,
+    on_dialogue: Callable[[dict], None] = None
+) -> dict:
+    """Generate and save the state a transition leads to, once per state hash.
+    
+    `parent_state` is the state the move was made from; the models see the
+    dialogues of every round leading up to it. `on_dialogue` only fires if
+    this call ends up doing the generation; callers that join an in-flight
+    generation just receive the saved state.
+    """
     
-    result = db.table("daily_setup").select("*, word_pairs(*)").eq("date", today.isoformat()).execute()
+    async def generate():
+        # Generate new dialogues if game not over
+        if transition["game_over"]:
+            dialogues = []
+        else:
+            dialogues = await generate_all_responses(
+                models=transition["remaining_models"],
+                mole_model=setup["mole_model"],
+                innocent_word=setup["innocent_word"],
+                mole_word=setup["mole_word"],
+                category=setup["category"],
+                round_number=transition["round_number"],
+                history=await get_history(parent_state),
+                on_dialogue=on_dialogue
+            )
+        
+        # Save to cache
+        return await save_game_state(
+            state_hash=transition["state_hash"],
+            game_date=game_date,
+            round_number=transition["round_number"],
+            remaining_models=transition["remaining_models"],
+            action=transition["action"],
+            dialogues=dialogues,
+            game_over=transition["game_over"],
+            winner=transition["winner"],
+            eliminated_model=transition["eliminated_model"],
+            parent_hash=parent_state["state_hash"] if parent_state else None
+        )
     
-    if not result.data:
+    # Concurrent requests for the same state share one generation
+    with span("state.generate", state_hash=transition["state_hash"], round_number=transition["round_number"]):
+        return await generate_once(transition["state_hash"], generate)
+
+
+async def _fetch_setup(game_date: date) -> dict:
+    setup = await get_storage().get_daily_setup(game_date)
+    
+    if not setup:
         return None
     
-    setup = result.data[0]
-    word_pair = setup.get("word_pairs", {})
+    word_pair = setup.get("word_pairs") or {}
     
     return {
         "id": setup["id"],
@@ -123,3 +307,65 @@ def get_today_setup() -> dict:
         "innocent_word": word_pair.get("innocent_word", ""),
         "mole_word": word_pair.get("mole_word", "")
     }
+
+
+async def _load_setup(game_date: date) -> tuple[dict, str]:
+    """Load a setup from the shared cache tier or storage; also says which."""
+    
+    shared = get_shared_cache()
+    setup = await shared.get("setup", game_date.isoformat())
+    if setup is not None:
+        return setup, "shared"
+    
+    setup = await _fetch_setup(game_date)
+    if setup:
+        await shared.set("setup", game_date.isoformat(), setup)
+    return setup, "storage"
+
+
+async def get_setup(game_date: date) -> dict:
+    """Get the game setup for a date, served from memory after the first lookup."""
+    
+    key = game_date.isoformat()
+    
+    with span("setup.lookup", date=key) as lookup_span:
+        cached = _setup_cache.get(key)
+        if cached is not None:
+            lookup_span.set_attribute("source", "memory")
+            return cached
+        
+        setup, source = await _setup_flight.do(key, lambda: _load_setup(game_date))
+        lookup_span.set_attribute("source", source)
+    
+    if setup:
+        # Only today's and tomorrow's setups are ever needed
+        for stale in [k for k in _setup_cache if k < date.today().isoformat()]:
+            del _setup_cache[stale]
+        _setup_cache[key] = setup
+    
+    return setup
+
+
+async def get_today_setup() -> dict:
+    """Get today's game setup."""
+    
+    return await get_setup(date.today())
+
+
+async def warm_setup(game_date: date = None) -> dict:
+    """Make sure a date's setup exists and is loaded into memory.
+    
+    Concurrent callers for the same date share one creation.
+    """
+    
+    game_date = game_date or date.today()
+    
+    async def warm():
+        setup = await get_setup(game_date)
+        if not setup:
+            print("Creating new daily setup...")
+            await create_daily_setup(game_date)
+            setup = await get_setup(game_date)
+        return setup
+    
+    return await _warm_flight.do(game_date.isoformat(), warm)
@@ -0,0 +1,90 @@
+from app.config import get_settings
+from app.prompts import format_history
+from app.services.cache_service import get_cached_state
+from app.services.lru_cache import LRUCache
+from app.tracing import span
+
+settings = get_settings()
+
+# Rounds and prompt history block per state hash, shared by all models of the next round
+_history_cache = LRUCache(max_entries=settings.history_cache_max_entries)
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token; close enough for budgeting
+    return len(text) // 4
+
+
+def _shorten(message: str, words: int) -> str:
+    parts = message.split()
+    if len(parts) <= words:
+        return message
+    return " ".join(parts[:words]) + "…"
+
+
+def fit_history(rounds: list[tuple[int, list[dict]]], token_budget: int = None, summary_words: int = None) -> str:
+    """Format rounds within a token budget.
+    
+    Over budget, the oldest rounds are condensed to their first few words per
+    message, then dropped entirely. The most recent round is always kept whole.
+    """
+    
+    token_budget = settings.history_token_budget if token_budget is None else token_budget
+    summary_words = summary_words or settings.history_summary_words
+    rounds = list(rounds)
+    
+    block = format_history(rounds)
+    
+    condensed = 0
+    while estimate_tokens(block) > token_budget and condensed < len(rounds) - 1:
+        round_number, dialogues = rounds[condensed]
+        rounds[condensed] = (
+            round_number,
+            [{**dialogue, "message": _shorten(dialogue["message"], summary_words)} for dialogue in dialogues]
+        )
+        condensed += 1
+        block = format_history(rounds)
+    
+    omitted = 0
+    while estimate_tokens(block) > token_budget and len(rounds) > 1:
+        rounds.pop(0)
+        omitted += 1
+        block = format_history(rounds, omitted_rounds=omitted)
+    
+    return block
+
+
+async def _history_entry(state: dict) -> dict:
+    entry = _history_cache.get(state["state_hash"])
+    if entry is not None:
+        return entry
+    
+    # A state's rounds are its parent's rounds plus its own, so each block is built incrementally
+    rounds = []
+    parent_hash = state.get("parent_hash")
+    if parent_hash and parent_hash != state["state_hash"]:
+        parent = await get_cached_state(parent_hash)
+        if parent:
+            rounds = list((await _history_entry(parent))["rounds"])
+    
+    if state.get("dialogues"):
+        rounds.append((state["round_number"], state["dialogues"]))
+    
+    entry = {"rounds": rounds, "block": fit_history(rounds)}
+    _history_cache.set(state["state_hash"], entry)
+    return entry
+
+
+async def get_history(state: dict | None) -> str:
+    """Prompt history for the round that follows `state`.
+    
+    Follows the parent_hash chain back to the first round, so every earlier
+    round is included, not just the previous one. States saved before
+    parent_hash existed contribute only their own round.
+    """
+    
+    if not state:
+        return ""
+    
+    with span("history.build", state_hash=state["state_hash"]):
+        return (await _history_entry(state))["block"]
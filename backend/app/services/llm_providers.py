@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+from typing import TYPE_CHECKING
+from app.config import get_settings
+from app.prompts import OPENROUTER_MODELS
+
+if TYPE_CHECKING:
+    import httpx
+
+settings = get_settings()
+
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+
+class LLMProvider:
+    """Backend for chat completions.
+
+    `chat_completion` takes an OpenRouter-style request payload and returns
+    an OpenRouter-style response (`choices[0].message.content`, `usage`).
+    """
+
+    name = "base"
+
+    async def chat_completion(self, payload: dict) -> dict:
+        raise NotImplementedError
+
+    async def warm(self):
+        """Open connections ahead of the first completion."""
+        pass
+
+    async def close(self):
+        pass
+
+
+class OpenRouterProvider(LLMProvider):
+    """Real completions from openrouter.ai over one long-lived, pooled client."""
+
+    name = "openrouter"
+
+    def __init__(self):
+        self._client: "httpx.AsyncClient | None" = None
+
+    def get_http_client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            # Imported here to keep it off the app's import path
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=settings.openrouter_timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.openrouter_max_connections,
+                    max_keepalive_connections=settings.openrouter_max_keepalive_connections
+                ),
+                headers={
+                    "Authorization": f"Bearer {settings.openrouter_api_key}",
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://ai-mole-game.vercel.app",
+                    "X-Title": "AI Mole Game"
+                }
+            )
+        return self._client
+
+    async def chat_completion(self, payload: dict) -> dict:
+        response = await self.get_http_client().post(OPENROUTER_CHAT_URL, json=payload)
+
+        if response.status_code != 200:
+            raise Exception(f"OpenRouter API error: {response.text}")
+
+        return response.json()
+
+    async def warm(self):
+        try:
+            # Any response will do; the point is a pooled TLS connection
+            await self.get_http_client().head(OPENROUTER_CHAT_URL)
+        except Exception as e:
+            print(f"OpenRouter warm-up failed: {str(e)}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+MOCK_HINTS = [
+    "Bazıları için bir tutku, bazıları için sadece bir alışkanlık.",
+    "Kalabalıkların aynı anda nefesini tuttuğu bir an düşün.",
+    "Çocukluğunun bir köşesinde mutlaka izi vardır.",
+    "Sabırla beklenir, ama anı kısa sürer.",
+    "Herkes tanır, ama kimse tam olarak tarif edemez.",
+    "Bir yanı gelenek, bir yanı tamamen modern.",
+    "Şüpheliler hep fazla emin konuşur, dikkat edin.",
+    "Renkleri olmasa bu kadar sevilmezdi belki.",
+]
+
+
+class MockProvider(LLMProvider):
+    """Offline provider for load tests.
+
+    Replies are deterministic for a given (model, prompt) and follow the JSON
+    format the system prompt asks for. Latency is log-normal around a
+    per-model median, and errors are injected at a per-model rate, both drawn
+    from a seeded RNG so runs are reproducible.
+    """
+
+    name = "mock"
+
+    def __init__(
+        self,
+        latency_ms: dict[str, float] = None,
+        error_rates: dict[str, float] = None,
+        default_latency_ms: float = 800.0,
+        default_error_rate: float = 0.0,
+        latency_sigma: float = 0.5,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms or {}
+        self.error_rates = error_rates or {}
+        self.default_latency_ms = default_latency_ms
+        self.default_error_rate = default_error_rate
+        self.latency_sigma = latency_sigma
+        self._random = random.Random(seed)
+        self._names = {route: name for name, route in OPENROUTER_MODELS.items()}
+        self._cached_prefixes: set[tuple[str, str]] = set()
+        self.calls = 0
+
+    def _lookup(self, table: dict, route: str, default: float) -> float:
+        # Accept either the OpenRouter route or the in-game model name as key
+        if route in table:
+            return table[route]
+        return table.get(self._names.get(route, ""), default)
+
+    def _cached_tokens(self, route: str, messages: list[dict]) -> int:
+        # Mimic explicit prompt caching: a cache_control part is free after its first use per route
+        cached = 0
+        for message in messages:
+            if not isinstance(message["content"], list):
+                continue
+            for part in message["content"]:
+                if "cache_control" not in part:
+                    continue
+                key = (route, hashlib.sha256(part["text"].encode()).hexdigest())
+                if key in self._cached_prefixes:
+                    cached += len(part["text"]) // 4
+                self._cached_prefixes.add(key)
+        return cached
+
+    def sample_latency(self, route: str) -> float:
+        median = self._lookup(self.latency_ms, route, self.default_latency_ms) / 1000
+        return median * math.exp(self._random.gauss(0, self.latency_sigma))
+
+    async def chat_completion(self, payload: dict) -> dict:
+        self.calls += 1
+        route = payload["model"]
+
+        await asyncio.sleep(self.sample_latency(route))
+
+        if self._random.random() < self._lookup(self.error_rates, route, self.default_error_rate):
+            raise Exception(f"Mock upstream error for {route}")
+
+        prompt = json.dumps(payload["messages"], ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha256(f"{route}|{prompt}".encode()).hexdigest()
+        hint = MOCK_HINTS[int(digest[:8], 16) % len(MOCK_HINTS)]
+
+        content = json.dumps({
+            "message": hint,
+            "internal_thought": f"mock:{digest[:12]}"
+        }, ensure_ascii=False)
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        cached_tokens = self._cached_tokens(route, payload["messages"])
+
+        return {
+            "id": f"mock-{digest[:16]}",
+            "model": route,
+            "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}
+            }
+        }
+
+
+_provider: LLMProvider | None = None
+
+
+def _create_provider() -> LLMProvider:
+    if settings.llm_provider == "mock":
+        return MockProvider(
+            latency_ms=settings.mock_llm_latency_ms,
+            error_rates=settings.mock_llm_error_rates,
+            default_latency_ms=settings.mock_llm_default_latency_ms,
+            default_error_rate=settings.mock_llm_default_error_rate,
+            latency_sigma=settings.mock_llm_latency_sigma,
+            seed=settings.mock_llm_seed
+        )
+    if settings.llm_provider == "openrouter":
+        return OpenRouterProvider()
+
+    raise ValueError(f"Unknown LLM provider: {settings.llm_provider}")
+
+
+def get_llm_provider() -> LLMProvider:
+    global _provider
+    if _provider is None:
+        _provider = _create_provider()
+    return _provider
+
+
+async def close_llm_provider():
+    if _provider is not None:
+        await _provider.close()
@@ -0,0 +1,111 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory cost of a JSON-like value in bytes."""
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode())
+    except (TypeError, ValueError):
+        return len(repr(value).encode())
+
+
+class LRUCache:
+    """Bounded LRU cache with an entry cap, a byte cap and an optional TTL.
+
+    A cap or TTL of 0 means no limit.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 0, ttl: float = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.peek(key) is not None
+
+    def _is_expired(self, stored_at: float) -> bool:
+        return bool(self.ttl) and time.monotonic() - stored_at > self.ttl
+
+    def _remove(self, key: str):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def peek(self, key: str):
+        """Return a value without touching recency or the hit counters."""
+        entry = self._data.get(key)
+        if entry is None or self._is_expired(entry[2]):
+            return None
+        return entry[0]
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, _, stored_at = entry
+        if self._is_expired(stored_at):
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        size = estimate_size(value)
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (value, size, time.monotonic())
+        self._bytes += size
+
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        if key in self._data:
+            self._remove(key)
+
+    def evict_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches the predicate."""
+        stale = [key for key, (value, _, _) in self._data.items() if predicate(value)]
+        for key in stale:
+            self._remove(key)
+        self.evictions += len(stale)
+        return len(stale)
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import itertools
+import time
+import traceback
+from datetime import date
+from app.config import get_settings
+from app.services.game_engine import generate_state, get_setup, warm_setup
+from app.services.singleflight import DatabaseLock, FileLock
+from app.services.transitions import get_transition_table
+
+settings = get_settings()
+
+
+async def precompute_game_tree(game_date: date = None, max_states: int = None, concurrency: int = None) -> dict:
+    """Walk the reachable game tree for a day and fill game_states ahead of traffic.
+
+    States are visited most-likely first, assuming each player picks uniformly
+    among the moves available to them, so the branches most players reach are
+    generated before the budget runs out. Only states that need an LLM round
+    count towards `max_states`; game-over states are saved for free.
+    """
+
+    game_date = game_date or date.today()
+    max_states = settings.precompute_max_states if max_states is None else max_states
+    concurrency = concurrency or settings.precompute_concurrency
+
+    setup = await get_setup(game_date) or await warm_setup(game_date)
+    if not setup:
+        raise Exception(f"No daily setup for {game_date.isoformat()}")
+
+    started = time.monotonic()
+    stats = {"date": game_date.isoformat(), "generated": 0, "cached": 0, "terminal": 0, "skipped": 0}
+
+    table = get_transition_table(setup, game_date)
+    root_hash = table.root
+    root = await table.get_state(root_hash)
+    if not root:
+        raise Exception(f"First round for {game_date.isoformat()} is not generated yet")
+
+    # Max-heap on branch probability; the counter keeps ordering stable for ties
+    counter = itertools.count()
+    frontier: list = []
+    seen = {root_hash}
+
+    def push_children(state: dict, probability: float):
+        moves = table.moves(table.resolve(state["state_hash"]))
+        for transition in moves.values():
+            if transition["state_hash"] in seen:
+                continue
+            seen.add(transition["state_hash"])
+            child_probability = probability / len(moves)
+            heapq.heappush(frontier, (-child_probability, next(counter), transition, state))
+
+    push_children(root, 1.0)
+
+    async def visit(transition: dict, parent: dict, probability: float):
+        cached = await table.get_state(transition["state_hash"])
+        if cached:
+            stats["cached"] += 1
+            state = cached
+        else:
+            state = await generate_state(setup, game_date, transition, parent)
+            if transition["game_over"]:
+                stats["terminal"] += 1
+            else:
+                stats["generated"] += 1
+        if not state.get("game_over"):
+            push_children(state, probability)
+
+    while frontier:
+        batch = []
+        llm_in_batch = 0
+        while frontier and len(batch) < concurrency:
+            negative_probability, _, transition, parent = heapq.heappop(frontier)
+            if not transition["game_over"]:
+                if stats["generated"] + llm_in_batch >= max_states:
+                    stats["skipped"] += 1
+                    continue
+                llm_in_batch += 1
+            batch.append((transition, parent, -negative_probability))
+
+        if not batch:
+            continue
+
+        results = await asyncio.gather(
+            *(visit(transition, parent, probability) for transition, parent, probability in batch),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Precompute error: {str(result)}")
+
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def _precompute_lock():
+    if settings.generation_lock == "db":
+        return DatabaseLock(settings.precompute_lock_ttl)
+    # Workers on one host share the lock directory even when generation_lock is "none"
+    return FileLock(settings.generation_lock_dir, settings.precompute_lock_ttl)
+
+
+async def run_precompute(game_date: date = None):
+    """Background entry point: precompute a day's tree and log the outcome.
+
+    Every worker runs the scheduler, so a per-date lock lets only one of them
+    pay for the LLM rounds; the others skip the date.
+    """
+
+    if not settings.precompute_enabled:
+        return None
+
+    game_date = game_date or date.today()
+    lock = _precompute_lock()
+    lock_key = f"precompute-{game_date.isoformat()}"
+
+    if not await lock.acquire(lock_key):
+        print(f"Game tree for {game_date.isoformat()} is being precomputed by another worker")
+        return None
+
+    try:
+        stats = await precompute_game_tree(game_date)
+        print(f"Precomputed game tree: {stats}")
+        return stats
+    except Exception as e:
+        print(f"Error precomputing game tree: {str(e)}")
+        print(traceback.format_exc())
+        return None
+    finally:
+        await lock.release(lock_key)
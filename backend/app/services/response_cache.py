@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from app.config import get_settings
+from app.metrics import LLM_RESPONSE_CACHE_LOOKUPS
+from app.services.lru_cache import LRUCache
+from app.storage import get_storage
+
+settings = get_settings()
+
+
+def response_key(openrouter_model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+    """Content address of an upstream call: the same inputs give the same key on any day or branch."""
+
+    fingerprint = json.dumps([openrouter_model, system_prompt, user_prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Raw reply content by response_key, so identical calls are paid for once."""
+
+    name = "base"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> str | None:
+        content = await self._get(key)
+        if content is None:
+            self.misses += 1
+            LLM_RESPONSE_CACHE_LOOKUPS.inc(backend=self.name, result="miss")
+        else:
+            self.hits += 1
+            LLM_RESPONSE_CACHE_LOOKUPS.inc(backend=self.name, result="hit")
+        return content
+
+    async def _get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, openrouter_model: str, content: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+class NullResponseCache(ResponseCache):
+    name = "none"
+
+    async def get(self, key: str) -> str | None:
+        return None
+
+    async def set(self, key: str, openrouter_model: str, content: str):
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        super().__init__()
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+
+    async def _get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, openrouter_model: str, content: str):
+        self._cache.set(key, content)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "entries": len(self._cache), "evictions": self._cache.evictions}
+
+
+class DiskResponseCache(ResponseCache):
+    """One JSON file per key under `directory`, shared by every worker on the host.
+
+    Expiry uses file mtimes. Once the directory grows past `max_bytes`, the
+    oldest files are removed until it is back under 90% of the limit.
+    """
+
+    name = "disk"
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._bytes: int | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["content"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write(self, key: str, openrouter_model: str, content: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"route": openrouter_model, "content": content}, ensure_ascii=False)
+
+        # Write then rename, so readers in other workers never see half a file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        if self._bytes is None:
+            self._bytes = sum(size for _, _, size in self._scan())
+        else:
+            self._bytes += len(data.encode())
+        if self.max_bytes and self._bytes > self.max_bytes:
+            self._evict()
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        now = time.time()
+        for mtime, path, size in entries:
+            if total <= self.max_bytes * 0.9 and not (self.ttl and now - mtime > self.ttl):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._bytes = total
+
+    async def _get(self, key: str) -> str | None:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, openrouter_model: str, content: str):
+        await asyncio.to_thread(self._write, key, openrouter_model, content)
+
+
+class StorageResponseCache(ResponseCache):
+    """Replies kept in the configured storage backend's llm_responses table.
+
+    Rows older than the TTL are ignored on read and deleted by a periodic
+    sweep, which is also what bounds the table's size.
+    """
+
+    name = "db"
+
+    def __init__(self, ttl: float, sweep_interval: float = 3600.0):
+        super().__init__()
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+
+    def _cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+
+    async def _get(self, key: str) -> str | None:
+        row = await get_storage().get_llm_response(key)
+        if not row:
+            return None
+        if self.ttl and datetime.fromisoformat(row["created_at"]) < self._cutoff():
+            return None
+        return row["content"]
+
+    async def set(self, key: str, openrouter_model: str, content: str):
+        storage = get_storage()
+        await storage.save_llm_response({
+            "key": key,
+            "route": openrouter_model,
+            "content": content,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+
+        if self.ttl and time.monotonic() - self._last_sweep > self.sweep_interval:
+            self._last_sweep = time.monotonic()
+            await storage.delete_llm_responses_before(self._cutoff())
+
+
+_cache: ResponseCache | None = None
+
+
+def _create_cache() -> ResponseCache:
+    backend = settings.llm_response_cache
+
+    if backend == "none":
+        return NullResponseCache()
+    if backend == "memory":
+        return MemoryResponseCache(
+            max_entries=settings.llm_response_cache_max_entries,
+            max_bytes=settings.llm_response_cache_max_bytes,
+            ttl=settings.llm_response_cache_ttl
+        )
+    if backend == "disk":
+        return DiskResponseCache(
+            directory=settings.llm_response_cache_dir,
+            max_bytes=settings.llm_response_cache_max_bytes,
+            ttl=settings.llm_response_cache_ttl
+        )
+    if backend == "db":
+        return StorageResponseCache(ttl=settings.llm_response_cache_ttl)
+
+    raise ValueError(f"Unknown LLM response cache: {backend}")
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = _create_cache()
+    return _cache
@@ -0,0 +1,163 @@
+import json
+import re
+from app.metrics import LLM_PARSE_RESULTS, LLM_MESSAGES_TRUNCATED
+
+# Matches the "Maksimum 30 kelime" rule in the system prompt
+MAX_MESSAGE_WORDS = 30
+
+# Parse outcomes, best first: valid JSON, JSON after repairs, message salvaged by regex, raw text
+OK = "ok"
+REPAIRED = "repaired"
+PARTIAL = "partial"
+RAW = "raw"
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_MESSAGE_RE = re.compile(r'"message"\s*:\s*"((?:[^"\\]|\\.)*)', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+_stats: dict[str, dict[str, int]] = {}
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE_RE.search(text)
+    return match.group(1).strip() if match else text.strip()
+
+
+def _extract_object(text: str) -> tuple[str | None, bool]:
+    """Find the first JSON object in `text` in a single scan.
+
+    Text after the closing brace is ignored. Single-quoted strings are
+    rewritten with double quotes, and an object cut off mid-reply is closed
+    off. Returns the object text and whether it needed any repair.
+    """
+
+    start = text.find("{")
+    if start == -1:
+        return None, False
+
+    out = []
+    depth = 0
+    quote = None
+    escaped = False
+    repaired = False
+
+    for ch in text[start:]:
+        if quote:
+            if escaped:
+                escaped = False
+                if ch == "'" and quote == "'":
+                    out[-1] = "'"
+                    continue
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+                out.append('"')
+                continue
+            elif ch == '"':
+                out.append('\\"')
+                continue
+            out.append(ch)
+            continue
+
+        if ch in "\"'":
+            quote = ch
+            repaired = repaired or ch == "'"
+            out.append('"')
+            continue
+
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                out.append(ch)
+                return "".join(out), repaired
+
+        out.append(ch)
+
+    # Reply was truncated: close the open string and objects
+    if escaped:
+        out.pop()
+    if quote:
+        out.append('"')
+    out.append("}" * depth)
+    return "".join(out), True
+
+
+def _loads(candidate: str) -> tuple[dict | None, bool]:
+    """Load an object, retrying once without trailing commas; also says whether that was needed."""
+
+    for repaired, attempt in ((False, candidate), (True, _TRAILING_COMMA_RE.sub(r"\1", candidate))):
+        try:
+            parsed = json.loads(attempt, strict=False)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed, repaired
+    return None, False
+
+
+def limit_words(message: str, max_words: int = MAX_MESSAGE_WORDS) -> tuple[str, bool]:
+    words = message.split()
+    if len(words) <= max_words:
+        return message, False
+    return " ".join(words[:max_words]) + "…", True
+
+
+def parse_reply(content: str, max_words: int = MAX_MESSAGE_WORDS) -> tuple[dict, str]:
+    """Turn a model's raw reply into message and internal_thought.
+
+    Returns the parsed fields and the outcome (OK, REPAIRED, PARTIAL or
+    RAW). The message is always capped at `max_words` words.
+    """
+
+    text = _strip_fences(content or "")
+    candidate, repaired = _extract_object(text)
+
+    parsed, comma_repaired = _loads(candidate) if candidate else (None, False)
+    repaired = repaired or comma_repaired
+    message = parsed.get("message") if parsed else None
+
+    if isinstance(message, str) and message.strip():
+        status = REPAIRED if repaired else OK
+        thought = parsed.get("internal_thought", "")
+        fields = {"message": message.strip(), "internal_thought": thought if isinstance(thought, str) else str(thought)}
+    elif candidate and (match := _MESSAGE_RE.search(candidate)):
+        status = PARTIAL
+        try:
+            message = json.loads(f'"{match.group(1)}"', strict=False)
+        except json.JSONDecodeError:
+            message = match.group(1)
+        fields = {"message": message.strip(), "internal_thought": "JSON parse hatası"}
+    else:
+        # No usable JSON; show the reply itself, as before
+        status = RAW
+        fields = {"message": text, "internal_thought": "JSON parse hatası"}
+
+    fields["message"], truncated = limit_words(fields["message"], max_words)
+    fields["truncated"] = truncated
+    return fields, status
+
+
+def record_parse(model_name: str, status: str, truncated: bool = False):
+    stats = _stats.setdefault(model_name, {OK: 0, REPAIRED: 0, PARTIAL: 0, RAW: 0, "truncated": 0})
+    stats[status] += 1
+    LLM_PARSE_RESULTS.inc(model=model_name, status=status)
+    if truncated:
+        stats["truncated"] += 1
+        LLM_MESSAGES_TRUNCATED.inc(model=model_name)
+
+
+def get_parse_stats() -> dict:
+    """Parse outcomes per model; `failure_rate` counts replies with no usable JSON."""
+
+    report = {}
+    for model_name, stats in _stats.items():
+        total = sum(stats[status] for status in (OK, REPAIRED, PARTIAL, RAW))
+        report[model_name] = {
+            **stats,
+            "total": total,
+            "failure_rate": round(stats[RAW] / total, 3) if total else 0.0
+        }
+    return report
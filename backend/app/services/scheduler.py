@@ -0,0 +1,63 @@
+import asyncio
+import traceback
+from datetime import date, datetime, timedelta
+from app.config import get_settings
+from app.services.game_engine import warm_setup
+from app.services.precompute import run_precompute
+from app.services.transitions import get_transition_table
+
+settings = get_settings()
+
+_task: asyncio.Task | None = None
+
+
+def seconds_until_midnight(now: datetime = None) -> float:
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+async def _warm(game_date: date):
+    try:
+        setup = await warm_setup(game_date)
+        print(f"Daily setup for {game_date.isoformat()} warmed: {bool(setup)}")
+        if setup:
+            get_transition_table(setup, game_date)
+            await run_precompute(game_date)
+    except Exception as e:
+        print(f"Error warming daily setup for {game_date.isoformat()}: {str(e)}")
+        print(traceback.format_exc())
+
+
+async def _daily_loop():
+    """Warm today's setup and game tree now, then tomorrow's shortly before each midnight."""
+
+    await _warm(date.today())
+
+    while True:
+        tomorrow = date.today() + timedelta(days=1)
+        lead = settings.setup_prewarm_lead_seconds
+        await asyncio.sleep(max(seconds_until_midnight() - lead, 0))
+
+        await _warm(tomorrow)
+
+        # Wait for the day to roll over before planning the next warm-up
+        while date.today() < tomorrow:
+            await asyncio.sleep(seconds_until_midnight() + 1)
+
+
+def start_scheduler():
+    global _task
+    if settings.scheduler_enabled and _task is None:
+        _task = asyncio.create_task(_daily_loop())
+
+
+async def stop_scheduler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from app.config import get_settings
+from app.metrics import SHARED_CACHE_LOOKUPS
+
+settings = get_settings()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries (expires_at);
+"""
+
+
+class SharedCache:
+    """Cache tier shared by every worker process on a host.
+
+    Sits between each worker's in-process cache and storage, so a state or
+    setup loaded or generated by one worker is a local read for the others.
+    Values are JSON-serialisable dicts, grouped by namespace ("state", "setup").
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._lookups: dict[str, dict[str, int]] = {}
+
+    async def get(self, namespace: str, key: str) -> dict | None:
+        value = await self._get(namespace, key)
+        result = "miss" if value is None else "hit"
+        counts = self._lookups.setdefault(namespace, {"hit": 0, "miss": 0})
+        counts[result] += 1
+        SHARED_CACHE_LOOKUPS.inc(namespace=namespace, result=result)
+        return value
+
+    async def _get(self, namespace: str, key: str) -> dict | None:
+        raise NotImplementedError
+
+    async def set(self, namespace: str, key: str, value: dict):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        report = {"backend": self.name}
+        for namespace, counts in self._lookups.items():
+            lookups = counts["hit"] + counts["miss"]
+            report[namespace] = {
+                "hits": counts["hit"],
+                "misses": counts["miss"],
+                "hit_ratio": round(counts["hit"] / lookups, 4) if lookups else None
+            }
+        return report
+
+
+class NullSharedCache(SharedCache):
+    name = "none"
+
+    async def get(self, namespace: str, key: str) -> dict | None:
+        return None
+
+    async def set(self, namespace: str, key: str, value: dict):
+        pass
+
+
+class SQLiteSharedCache(SharedCache):
+    """Shared tier in a local SQLite file in WAL mode.
+
+    Every worker opens the same file; WAL lets them read while one writes.
+    Entries expire `ttl` seconds after they are written and are swept out
+    periodically by whichever worker is writing.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, ttl: float, sweep_interval: float = 3600.0):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        def call():
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    return fn(conn, *args)
+        return await asyncio.to_thread(call)
+
+    async def _get(self, namespace: str, key: str) -> dict | None:
+        def query(conn):
+            return conn.execute(
+                "SELECT data FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        row = await self._run(query)
+        return json.loads(row[0]) if row else None
+
+    async def set(self, namespace: str, key: str, value: dict):
+        sweep = time.monotonic() - self._last_sweep > self.sweep_interval
+        if sweep:
+            self._last_sweep = time.monotonic()
+
+        def query(conn):
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, expires_at, data) VALUES (?, ?, ?, ?)",
+                (namespace, key, now + self.ttl, json.dumps(value, ensure_ascii=False))
+            )
+            if sweep:
+                conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        await self._run(query)
+
+    async def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: SharedCache | None = None
+
+
+def _create_cache() -> SharedCache:
+    backend = settings.shared_cache
+
+    if backend == "none":
+        return NullSharedCache()
+    if backend == "sqlite":
+        return SQLiteSharedCache(path=settings.shared_cache_path, ttl=settings.shared_cache_ttl)
+
+    raise ValueError(f"Unknown shared cache: {backend}")
+
+
+def get_shared_cache() -> SharedCache:
+    global _cache
+    if _cache is None:
+        _cache = _create_cache()
+    return _cache
+
+
+async def close_shared_cache():
+    if _cache is not None:
+        await _cache.close()
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+from app.config import get_settings
+from app.services.cache_service import get_cached_state
+from app.services.state_writer import StateWriter, get_state_writer
+
+settings = get_settings()
+
+
+class SingleFlight:
+    """Run at most one coroutine per key; concurrent callers share its result."""
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, fn))
+            self._calls[key] = task
+        # Shield so a disconnecting caller doesn't cancel the work for everyone else
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable]):
+        try:
+            return await fn()
+        finally:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class FileLock:
+    """Cross-worker lock using O_EXCL lock files, for single-host deployments."""
+
+    def __init__(self, lock_dir: str, ttl: float):
+        self.lock_dir = lock_dir
+        self.ttl = ttl
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, f"{key}.lock")
+
+    async def acquire(self, key: str) -> bool:
+        path = self._path(key)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # Steal locks left behind by a crashed worker
+            try:
+                if time.time() - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+                    return await self.acquire(key)
+            except FileNotFoundError:
+                return await self.acquire(key)
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    async def release(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class DatabaseLock:
+    """Cross-worker lock using an advisory row per state hash.
+
+    Uses the generation_locks table from supabase_schema.sql. Only a
+    conflicting insert means the lock is held; if the database can't be
+    reached, the lock fails open so generation isn't held up.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    async def acquire(self, key: str) -> bool:
+        from app.database import DatabaseError, get_db
+        db = get_db()
+        now = datetime.now(timezone.utc)
+
+        # Clear an expired lock for this key before trying to take it
+        await db.table("generation_locks").delete().eq("state_hash", key).lt("expires_at", now.isoformat()).execute()
+
+        try:
+            await db.table("generation_locks").insert({
+                "state_hash": key,
+                "expires_at": (now + timedelta(seconds=self.ttl)).isoformat()
+            }).execute(raise_on_error=True)
+        except DatabaseError as e:
+            # 409: another worker's row for this key (duplicate primary key)
+            if e.status_code == 409:
+                return False
+            print(f"Generation lock for {key} unavailable, proceeding without it: {str(e)}")
+        return True
+
+    async def release(self, key: str):
+        from app.database import get_db
+        db = get_db()
+        await db.table("generation_locks").delete().eq("state_hash", key).execute()
+
+
+def _create_lock():
+    if settings.generation_lock == "file":
+        return FileLock(settings.generation_lock_dir, settings.generation_lock_ttl)
+    if settings.generation_lock == "db":
+        return DatabaseLock(settings.generation_lock_ttl)
+    return None
+
+
+_flight = SingleFlight()
+_lock = None
+_lock_loaded = False
+_releases: set[asyncio.Task] = set()
+
+
+def get_generation_lock():
+    global _lock, _lock_loaded
+    if not _lock_loaded:
+        _lock = _create_lock()
+        _lock_loaded = True
+    return _lock
+
+
+async def _wait_for_state(state_hash: str, timeout: float) -> dict | None:
+    """Poll the cache while another worker generates this state."""
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.generation_lock_poll_interval)
+        cached = await get_cached_state(state_hash)
+        if cached:
+            return cached
+    return None
+
+
+async def _release_when_stored(lock, writer: StateWriter, state_hash: str):
+    try:
+        if not await asyncio.wait_for(writer.wait_stored(state_hash), settings.generation_lock_ttl):
+            print(f"Game state {state_hash} was dropped by the writer, releasing its generation lock")
+    except asyncio.TimeoutError:
+        print(f"Game state {state_hash} not stored within the lock TTL, releasing its generation lock")
+    finally:
+        await lock.release(state_hash)
+
+
+async def _generate_with_lock(state_hash: str, generate: Callable[[], Awaitable[dict]]) -> dict:
+    lock = get_generation_lock()
+
+    if lock is None:
+        return await generate()
+
+    if not await lock.acquire(state_hash):
+        cached = await _wait_for_state(state_hash, settings.generation_lock_ttl)
+        if cached:
+            return cached
+        # The other worker never finished; generate it ourselves
+        print(f"Generation lock for {state_hash} timed out, generating locally")
+        return await generate()
+
+    release_now = True
+    try:
+        # Another worker may have finished between our cache miss and the lock
+        cached = await get_cached_state(state_hash)
+        if cached:
+            return cached
+        state = await generate()
+
+        writer = get_state_writer()
+        if writer is not None and state_hash in writer.pending:
+            # Write-behind has only queued the row, and other workers can't see it
+            # until it is stored; hold the lock until then without delaying this response
+            task = asyncio.create_task(_release_when_stored(lock, writer, state_hash))
+            _releases.add(task)
+            task.add_done_callback(_releases.discard)
+            release_now = False
+        return state
+    finally:
+        if release_now:
+            await lock.release(state_hash)
+
+
+async def generate_once(state_hash: str, generate: Callable[[], Awaitable[dict]]) -> dict:
+    """Generate and save a state at most once across concurrent requests.
+
+    `generate` must produce and save the state, returning the saved row.
+    """
+
+    return await _flight.do(state_hash, lambda: _generate_with_lock(state_hash, generate))
@@ -0,0 +1,38 @@
+from datetime import date
+from app.prompts import AI_MODELS
+
+# Bit i of a remaining-model mask is AI_MODELS[i]
+MODEL_INDEX = {name: index for index, name in enumerate(AI_MODELS)}
+ACTIONS = ("START", "PASS", "ELIMINATE")
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+NO_MODEL = 7
+
+# Layout, low bits first: eliminated model (3), action (2), remaining mask (6), round (4+)
+_ACTION_SHIFT = 3
+_MASK_SHIFT = 5
+_ROUND_SHIFT = 11
+
+
+def models_to_mask(models: list[str]) -> int:
+    mask = 0
+    for model in models:
+        try:
+            mask |= 1 << MODEL_INDEX[model]
+        except KeyError:
+            raise ValueError(f"Unknown model: {model}")
+    return mask
+
+
+def encode_state(round_number: int, remaining_models: list[str], action: str, eliminated_model: str = None) -> int:
+    eliminated = MODEL_INDEX[eliminated_model] if eliminated_model else NO_MODEL
+    return (
+        (round_number << _ROUND_SHIFT)
+        | (models_to_mask(remaining_models) << _MASK_SHIFT)
+        | (ACTION_CODES[action] << _ACTION_SHIFT)
+        | eliminated
+    )
+
+
+def state_key(game_date: date, round_number: int, remaining_models: list[str], action: str, eliminated_model: str = None) -> str:
+    """Compact, deterministic key for a game state, e.g. "20250101-0fe7" for a first round."""
+    return f"{game_date:%Y%m%d}-{encode_state(round_number, remaining_models, action, eliminated_model):04x}"
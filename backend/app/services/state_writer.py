@@ -0,0 +1,226 @@
+import asyncio
+import itertools
+import time
+import traceback
+from collections import deque
+from app.config import get_settings
+from app.metrics import STATE_WRITE_BATCH_SECONDS, STATE_WRITE_RETRIES, STATE_WRITES_DROPPED, STATE_WRITES_PENDING
+from app.storage import get_storage
+
+settings = get_settings()
+
+
+class StateWriter:
+    """Write-behind queue for game_states rows.
+
+    Rows are saved to storage in batches by a background task, so requests
+    never wait on the insert. Until a row is stored it stays in `pending`,
+    where get_cached_state finds it; failed batches are retried with
+    exponential backoff.
+
+    A batch that still fails is written row by row, so one row storage
+    rejects cannot hold back the rest. A row that fails `max_row_failures`
+    flushes on its own, or is the oldest when more than `max_pending` rows
+    are queued, is dropped into `dead_letters` and logged.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_retries: int,
+        retry_backoff: float,
+        retry_backoff_max: float,
+        max_row_failures: int = 3,
+        max_pending: int = 10000,
+        dead_letter_size: int = 100
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.max_row_failures = max_row_failures
+        self.max_pending = max_pending
+        self.pending: dict[str, dict] = {}
+        self.dead_letters: deque[dict] = deque(maxlen=dead_letter_size)
+        self.written = 0
+        self.failed_batches = 0
+        self.dead_lettered = 0
+        self._row_failures: dict[str, int] = {}
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def enqueue(self, row: dict):
+        if row["state_hash"] not in self.pending and len(self.pending) >= self.max_pending:
+            self._dead_letter(next(iter(self.pending.values())), "overflow", "write queue full")
+        self.pending[row["state_hash"]] = row
+        STATE_WRITES_PENDING.set(len(self.pending))
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Let rows from the same burst join the batch
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+
+            await self.flush()
+
+            if self.pending:
+                # Storage is still failing; keep the rows and try again later
+                await asyncio.sleep(self.retry_backoff_max)
+                self._wakeup.set()
+
+    async def wait_stored(self, state_hash: str) -> bool:
+        """Wait until the queued row for `state_hash` leaves the queue; False if it was dropped."""
+
+        if state_hash not in self.pending:
+            return True
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(state_hash, []).append(future)
+        return await future
+
+    def _settle(self, state_hash: str, stored: bool):
+        for future in self._waiters.pop(state_hash, []):
+            if not future.done():
+                future.set_result(stored)
+
+    def _dead_letter(self, row: dict, reason: str, error: str):
+        state_hash = row["state_hash"]
+        if self.pending.get(state_hash) is row:
+            del self.pending[state_hash]
+            self._settle(state_hash, False)
+        self._row_failures.pop(state_hash, None)
+        self.dead_letters.append(row)
+        self.dead_lettered += 1
+        STATE_WRITES_DROPPED.inc(reason=reason)
+        STATE_WRITES_PENDING.set(len(self.pending))
+        print(f"Giving up on writing game state {state_hash}: {error}")
+
+    def _stored(self, rows: list[dict]):
+        for row in rows:
+            # A row re-queued during the write goes out in the next batch
+            if self.pending.get(row["state_hash"]) is row:
+                del self.pending[row["state_hash"]]
+                self._settle(row["state_hash"], True)
+            self._row_failures.pop(row["state_hash"], None)
+        self.written += len(rows)
+        STATE_WRITES_PENDING.set(len(self.pending))
+
+    async def _store(self, rows: list[dict]):
+        saved = await get_storage().save_game_states(rows)
+        # Only rows the backend hands back are known to be stored
+        missing = {row["state_hash"] for row in rows} - {row["state_hash"] for row in saved}
+        if missing:
+            raise Exception(f"{len(missing)} of {len(rows)} game states not confirmed stored")
+
+    async def _write(self, rows: list[dict]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                await self._store(rows)
+                STATE_WRITE_BATCH_SECONDS.observe(time.perf_counter() - started, outcome="ok")
+                return True
+            except Exception as e:
+                STATE_WRITE_BATCH_SECONDS.observe(time.perf_counter() - started, outcome="error")
+                if attempt == self.max_retries:
+                    print(f"Error writing {len(rows)} game states: {str(e)}")
+                    print(traceback.format_exc())
+                    return False
+                delay = min(self.retry_backoff * 2 ** attempt, self.retry_backoff_max)
+                print(f"Writing {len(rows)} game states failed ({str(e)}), retrying in {delay:.1f}s")
+                STATE_WRITE_RETRIES.inc()
+                await asyncio.sleep(delay)
+
+    async def _write_singly(self, rows: list[dict]) -> list[dict]:
+        """Write a failed batch one row at a time; returns the rows stored."""
+
+        stored = []
+        for row in rows:
+            try:
+                await self._store([row])
+                stored.append(row)
+            except Exception as e:
+                failures = self._row_failures.get(row["state_hash"], 0) + 1
+                if failures >= self.max_row_failures:
+                    self._dead_letter(row, "rejected", str(e))
+                else:
+                    self._row_failures[row["state_hash"]] = failures
+        return stored
+
+    async def flush(self) -> bool:
+        """Write every pending row; False if rows are left that storage would not take."""
+
+        async with self._flush_lock:
+            while self.pending:
+                rows = list(itertools.islice(self.pending.values(), self.batch_size))
+                if await self._write(rows):
+                    self._stored(rows)
+                    continue
+
+                self.failed_batches += 1
+                stored = await self._write_singly(rows)
+                self._stored(stored)
+                if not stored and any(self.pending.get(row["state_hash"]) is row for row in rows):
+                    # Storage took none of them; keep the rest for a later flush
+                    return False
+            return True
+
+    async def close(self):
+        """Stop the background task and drain the queue."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if not await self.flush():
+            print(f"Shutting down with {len(self.pending)} game states not written")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "written": self.written,
+            "failed_batches": self.failed_batches,
+            "dead_lettered": self.dead_lettered
+        }
+
+
+_writer: StateWriter | None = None
+
+
+def get_state_writer() -> StateWriter | None:
+    """The running writer, or None when states are saved inline."""
+    return _writer
+
+
+def start_state_writer():
+    global _writer
+    if settings.state_write_behind and _writer is None:
+        _writer = StateWriter(
+            batch_size=settings.state_write_batch_size,
+            flush_interval=settings.state_write_flush_interval,
+            max_retries=settings.state_write_max_retries,
+            retry_backoff=settings.state_write_retry_backoff,
+            retry_backoff_max=settings.state_write_retry_backoff_max,
+            max_row_failures=settings.state_write_max_row_failures,
+            max_pending=settings.state_write_max_pending
+        )
+        _writer.start()
+
+
+async def stop_state_writer():
+    global _writer
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
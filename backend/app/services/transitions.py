@@ -0,0 +1,143 @@
+from datetime import date
+from app.config import get_settings
+from app.services.cache_service import compute_legacy_state_hash, compute_state_hash, get_cached_state, remember_state
+from app.services.game_engine import apply_action
+from app.services.state_codec import state_key
+
+settings = get_settings()
+
+_tables: dict[str, "TransitionTable"] = {}
+
+
+def possible_moves(round_number: int, remaining_models: list[str]) -> list[tuple[str, str | None]]:
+    """Every (action, target) a player can take from a state."""
+
+    moves = [("ELIMINATE", model) for model in remaining_models]
+    if round_number == 1:
+        moves.insert(0, ("PASS", None))
+    return moves
+
+
+class TransitionTable:
+    """Every state reachable in one day's game, and where each move from it leads.
+
+    Built once per setup by walking the game tree from the first round, so a
+    move resolves with two dict lookups instead of being validated and hashed
+    again. Keys are in the configured format; the same states' keys in the
+    other format (legacy MD5 hashes) resolve to them too.
+    """
+
+    def __init__(self, setup: dict, game_date: date):
+        self.setup = setup
+        self.game_date = game_date
+        self.states: dict[str, dict] = {}
+        self._aliases: dict[str, str] = {}
+        self._legacy: dict[str, str] = {}
+
+        self.root = self._add(1, setup["turn_order"], "START", None, game_over=False)
+        frontier = [self.root]
+        while frontier:
+            key = frontier.pop()
+            state = self.states[key]
+            for action, target in possible_moves(state["round_number"], state["remaining_models"]):
+                transition = apply_action(
+                    setup,
+                    game_date,
+                    state["round_number"],
+                    state["remaining_models"],
+                    action,
+                    target
+                )
+                state["moves"][(action, target)] = transition
+                if transition["state_hash"] not in self.states:
+                    self._add(
+                        transition["round_number"],
+                        transition["remaining_models"],
+                        action,
+                        transition["eliminated_model"],
+                        game_over=transition["game_over"]
+                    )
+                    if not transition["game_over"]:
+                        frontier.append(transition["state_hash"])
+
+    def _add(self, round_number: int, remaining_models: list[str], action: str, eliminated_model: str | None, game_over: bool) -> str:
+        key = compute_state_hash(self.game_date, round_number, remaining_models, action, eliminated_model)
+        self.states[key] = {
+            "round_number": round_number,
+            "remaining_models": remaining_models,
+            "game_over": game_over,
+            "moves": {}
+        }
+        legacy = compute_legacy_state_hash(self.game_date, round_number, remaining_models, action, eliminated_model)
+        self._legacy[key] = legacy
+        for alias in (key, state_key(self.game_date, round_number, remaining_models, action, eliminated_model), legacy):
+            self._aliases[alias] = key
+        return key
+
+    def resolve(self, state_hash: str) -> str | None:
+        """This table's key for a state hash in either format; None if it is not a state of this game."""
+        return self._aliases.get(state_hash)
+
+    async def get_state(self, state_hash: str) -> dict | None:
+        """The saved row for a state of this game, by any of its keys.
+
+        States saved before keys were compact are stored under their MD5
+        hash, which is only tried for dates up to STATE_KEY_LEGACY_UNTIL; a
+        row found that way is also cached under the current key.
+        """
+
+        key = self.resolve(state_hash)
+        if key is None:
+            return await get_cached_state(state_hash)
+
+        state = await get_cached_state(key)
+        legacy = self._legacy[key]
+        if state is None and legacy != key and self._may_have_legacy_rows():
+            state = await get_cached_state(legacy)
+            if state is not None:
+                remember_state(state, key)
+        return state
+
+    def _may_have_legacy_rows(self) -> bool:
+        cutover = settings.state_key_legacy_until
+        return cutover is not None and self.game_date <= cutover
+
+    def moves(self, state_hash: str) -> dict[tuple[str, str | None], dict]:
+        return self.states[state_hash]["moves"]
+
+    def next(self, state_hash: str, action: str, target_model: str = None) -> dict:
+        """The transition for a move, shaped like apply_action's result.
+
+        Raises ValueError for moves that are not allowed. The returned dict is
+        shared, so callers must not modify it.
+        """
+
+        state = self.states[state_hash]
+        transition = state["moves"].get((action, target_model if action == "ELIMINATE" else None))
+        if transition is not None:
+            return transition
+
+        if state["game_over"]:
+            raise ValueError("Game is over")
+
+        # Not a legal move; let apply_action say why
+        apply_action(self.setup, self.game_date, state["round_number"], state["remaining_models"], action, target_model)
+        raise ValueError("Invalid move")
+
+    def stats(self) -> dict:
+        return {"date": self.game_date.isoformat(), "states": len(self.states), "aliases": len(self._aliases)}
+
+
+def get_transition_table(setup: dict, game_date: date) -> TransitionTable:
+    """The transition table for a day's setup, built on first use."""
+
+    key = game_date.isoformat()
+    table = _tables.get(key)
+    if table is None or table.setup is not setup and table.setup.get("id") != setup.get("id"):
+        table = TransitionTable(setup, game_date)
+
+        # Only today's and tomorrow's tables are ever needed
+        for stale in [k for k in _tables if k < date.today().isoformat()]:
+            del _tables[stale]
+        _tables[key] = table
+    return table
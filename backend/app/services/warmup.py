@@ -0,0 +1,69 @@
+import asyncio
+import importlib
+import traceback
+from datetime import date
+from app.services.game_engine import warm_setup
+from app.services.llm_providers import get_llm_provider
+from app.services.transitions import get_transition_table
+from app.startup import mark_ready, startup_phase
+
+_task: asyncio.Task | None = None
+
+
+async def warm_pools():
+    # Heavy client libraries load lazily; import them off the event loop
+    await asyncio.to_thread(importlib.import_module, "httpx")
+    await get_llm_provider().warm()
+
+
+async def warm_state_cache(setup: dict, game_date: date) -> int:
+    """Load the first round and every state one move away into memory."""
+
+    table = get_transition_table(setup, game_date)
+    hashes = [table.root] + [transition["state_hash"] for transition in table.moves(table.root).values()]
+    states = await asyncio.gather(*(table.get_state(state_hash) for state_hash in hashes))
+    return sum(1 for state in states if state)
+
+
+async def warm_up():
+    """Get the process ready for traffic: pools, today's setup, then the state cache.
+
+    Each step is timed in the startup report. The process is marked ready
+    when warm-up ends, even if a step failed; requests then fall back to
+    doing that work on demand, and the report shows the error.
+    """
+
+    today = date.today()
+    try:
+        with startup_phase("pools"):
+            await warm_pools()
+
+        with startup_phase("setup"):
+            setup = await warm_setup(today)
+
+        if setup:
+            with startup_phase("state_cache"):
+                loaded = await warm_state_cache(setup, today)
+            print(f"Warmed {loaded} game states for {today.isoformat()}")
+    except Exception as e:
+        print(f"Error warming up: {str(e)}")
+        print(traceback.format_exc())
+    finally:
+        mark_ready()
+
+
+def start_warm_up():
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(warm_up())
+
+
+async def stop_warm_up():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
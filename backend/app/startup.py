@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+from app.metrics import STARTUP_PHASE_SECONDS
+
+# Imported first by app.main, so this is roughly when the app started loading
+_process_started = time.monotonic()
+
+_phases: dict[str, float] = {}
+_ready_after: float | None = None
+_errors: list[str] = []
+
+
+def record_phase(name: str, seconds: float):
+    _phases[name] = round(seconds, 4)
+    STARTUP_PHASE_SECONDS.set(seconds, phase=name)
+
+
+@contextmanager
+def startup_phase(name: str):
+    """Time one step of startup; failures are kept for the readiness report."""
+
+    started = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        _errors.append(f"{name}: {str(e)}")
+        raise
+    finally:
+        record_phase(name, time.monotonic() - started)
+
+
+def record_import_phase():
+    """Call at the start of the startup hook: everything before it was module imports."""
+    record_phase("import", time.monotonic() - _process_started)
+
+
+def mark_ready():
+    global _ready_after
+    if _ready_after is None:
+        _ready_after = time.monotonic() - _process_started
+        record_phase("total", _ready_after)
+        print(f"Ready after {_ready_after:.2f}s: {_phases}")
+
+
+def is_ready() -> bool:
+    return _ready_after is not None
+
+
+def get_startup_report() -> dict:
+    if not is_ready():
+        status = "starting"
+    else:
+        status = "degraded" if _errors else "ready"
+
+    return {
+        "status": status,
+        "ready": is_ready(),
+        "ready_after_seconds": round(_ready_after, 4) if _ready_after is not None else None,
+        "uptime_seconds": round(time.monotonic() - _process_started, 2),
+        "phases": dict(_phases),
+        "errors": list(_errors)
+    }
@@ -0,0 +1,45 @@
+import json
+from app.config import get_settings
+from app.storage.base import StorageBackend
+
+_storage: StorageBackend | None = None
+
+
+def _create_storage() -> StorageBackend:
+    settings = get_settings()
+    backend = settings.storage_backend
+
+    if backend == "memory":
+        from app.storage.memory import MemoryStorage
+        return MemoryStorage()
+    if backend == "sqlite":
+        from app.storage.sqlite import SQLiteStorage
+        return SQLiteStorage(settings.sqlite_path)
+    if backend == "supabase":
+        from app.storage.supabase import SupabaseStorage
+        return SupabaseStorage()
+
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        _storage = _create_storage()
+    return _storage
+
+
+async def init_storage():
+    storage = get_storage()
+    await storage.init()
+
+    # Local backends start empty; load word pairs from a JSON file if one is configured
+    seed_file = get_settings().storage_seed_file
+    if seed_file and storage.name != "supabase" and not await storage.list_word_pair_index():
+        with open(seed_file, encoding="utf-8") as f:
+            await storage.insert_word_pairs(json.load(f))
+
+
+async def close_storage():
+    if _storage is not None:
+        await _storage.close()
@@ -0,0 +1,66 @@
+from datetime import date, datetime
+
+
+class StorageBackend:
+    """Persistence for word pairs, daily setups, game states and cached LLM replies.
+
+    Rows are plain dicts shaped like the Supabase tables. Daily setups are
+    returned with their word pair joined under the "word_pairs" key.
+    """
+
+    name = "base"
+
+    async def init(self):
+        pass
+
+    async def close(self):
+        pass
+
+    # Word pairs
+
+    async def list_word_pair_index(self) -> list[dict]:
+        """Every word pair's id and difficulty, without the words themselves."""
+        raise NotImplementedError
+
+    async def get_word_pair(self, word_pair_id: str) -> dict | None:
+        raise NotImplementedError
+
+    async def insert_word_pairs(self, rows: list[dict]) -> list[dict]:
+        raise NotImplementedError
+
+    # Daily setup
+
+    async def get_daily_setup(self, game_date: date) -> dict | None:
+        raise NotImplementedError
+
+    async def insert_daily_setup(self, row: dict) -> dict | None:
+        raise NotImplementedError
+
+    async def get_recent_word_pair_ids(self, since: date) -> set:
+        """Ids of word pairs used by daily setups on or after `since`."""
+        raise NotImplementedError
+
+    # Game states
+
+    async def get_game_state(self, state_hash: str) -> dict | None:
+        raise NotImplementedError
+
+    async def save_game_states(self, rows: list[dict]) -> list[dict]:
+        """Upsert state rows on state_hash and return the stored rows; raises if the write fails."""
+        raise NotImplementedError
+
+    async def save_game_state(self, row: dict) -> dict | None:
+        saved = await self.save_game_states([row])
+        return saved[0] if saved else None
+
+    # LLM response cache
+
+    async def get_llm_response(self, key: str) -> dict | None:
+        raise NotImplementedError
+
+    async def save_llm_response(self, row: dict):
+        """Store a {key, route, content, created_at} row; an existing key is left alone."""
+        raise NotImplementedError
+
+    async def delete_llm_responses_before(self, cutoff: datetime):
+        raise NotImplementedError
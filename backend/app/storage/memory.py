@@ -0,0 +1,74 @@
+import copy
+import uuid
+from datetime import date, datetime
+from app.storage.base import StorageBackend
+
+
+class MemoryStorage(StorageBackend):
+    """Process-local storage for tests, benchmarks and offline development."""
+
+    name = "memory"
+
+    def __init__(self):
+        self.word_pairs: dict[str, dict] = {}
+        self.daily_setups: dict[str, dict] = {}
+        self.game_states: dict[str, dict] = {}
+        self.llm_responses: dict[str, dict] = {}
+
+    async def list_word_pair_index(self) -> list[dict]:
+        return [{"id": row["id"], "difficulty": row.get("difficulty", 3)} for row in self.word_pairs.values()]
+
+    async def get_word_pair(self, word_pair_id: str) -> dict | None:
+        row = self.word_pairs.get(word_pair_id)
+        return copy.deepcopy(row) if row else None
+
+    async def insert_word_pairs(self, rows: list[dict]) -> list[dict]:
+        inserted = []
+        for row in rows:
+            stored = {"difficulty": 3, **row}
+            stored.setdefault("id", str(uuid.uuid4()))
+            self.word_pairs[stored["id"]] = stored
+            inserted.append(copy.deepcopy(stored))
+        return inserted
+
+    async def get_daily_setup(self, game_date: date) -> dict | None:
+        row = self.daily_setups.get(game_date.isoformat())
+        if not row:
+            return None
+        return {**copy.deepcopy(row), "word_pairs": await self.get_word_pair(row["word_pair_id"]) or {}}
+
+    async def insert_daily_setup(self, row: dict) -> dict | None:
+        if row["date"] in self.daily_setups:
+            return None
+        stored = {"id": str(uuid.uuid4()), **row}
+        self.daily_setups[row["date"]] = stored
+        return copy.deepcopy(stored)
+
+    async def get_recent_word_pair_ids(self, since: date) -> set:
+        since_iso = since.isoformat()
+        return {row["word_pair_id"] for key, row in self.daily_setups.items() if key >= since_iso}
+
+    async def get_game_state(self, state_hash: str) -> dict | None:
+        row = self.game_states.get(state_hash)
+        return copy.deepcopy(row) if row else None
+
+    async def save_game_states(self, rows: list[dict]) -> list[dict]:
+        saved = []
+        for row in rows:
+            existing = self.game_states.get(row["state_hash"])
+            stored = {"id": existing["id"] if existing else str(uuid.uuid4()), **row}
+            self.game_states[row["state_hash"]] = stored
+            saved.append(copy.deepcopy(stored))
+        return saved
+
+    async def get_llm_response(self, key: str) -> dict | None:
+        row = self.llm_responses.get(key)
+        return dict(row) if row else None
+
+    async def save_llm_response(self, row: dict):
+        self.llm_responses.setdefault(row["key"], dict(row))
+
+    async def delete_llm_responses_before(self, cutoff: datetime):
+        cutoff_iso = cutoff.isoformat()
+        for key in [k for k, row in self.llm_responses.items() if row["created_at"] < cutoff_iso]:
+            del self.llm_responses[key]
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime
+from app.storage.base import StorageBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS word_pairs (
+    id TEXT PRIMARY KEY,
+    difficulty INTEGER NOT NULL DEFAULT 3,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daily_setup (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL UNIQUE,
+    word_pair_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS game_states (
+    id TEXT PRIMARY KEY,
+    state_hash TEXT NOT NULL,
+    date TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_game_states_state_hash ON game_states (state_hash);
+CREATE INDEX IF NOT EXISTS idx_game_states_date ON game_states (date);
+
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_responses_created_at ON llm_responses (created_at);
+"""
+
+
+class SQLiteStorage(StorageBackend):
+    """Local SQLite storage in WAL mode.
+
+    Rows are kept as JSON in a `data` column next to the indexed keys, so new
+    fields don't need a migration. Queries run in a worker thread to keep the
+    event loop free.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        def call():
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    return fn(conn, *args)
+        return await asyncio.to_thread(call)
+
+    async def init(self):
+        await self._run(lambda conn: None)
+
+    async def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _row(row_id: str, data: str) -> dict:
+        return {"id": row_id, **json.loads(data)}
+
+    async def list_word_pair_index(self) -> list[dict]:
+        def query(conn):
+            rows = conn.execute("SELECT id, difficulty FROM word_pairs").fetchall()
+            return [{"id": row_id, "difficulty": difficulty} for row_id, difficulty in rows]
+        return await self._run(query)
+
+    async def get_word_pair(self, word_pair_id: str) -> dict | None:
+        def query(conn):
+            row = conn.execute("SELECT id, data FROM word_pairs WHERE id = ?", (word_pair_id,)).fetchone()
+            return self._row(*row) if row else None
+        return await self._run(query)
+
+    async def insert_word_pairs(self, rows: list[dict]) -> list[dict]:
+        def query(conn):
+            inserted = []
+            for row in rows:
+                data = {"difficulty": 3, **{k: v for k, v in row.items() if k != "id"}}
+                row_id = row.get("id") or str(uuid.uuid4())
+                conn.execute(
+                    "INSERT OR REPLACE INTO word_pairs (id, difficulty, data) VALUES (?, ?, ?)",
+                    (row_id, data["difficulty"], json.dumps(data, ensure_ascii=False))
+                )
+                inserted.append({"id": row_id, **data})
+            return inserted
+        return await self._run(query)
+
+    async def get_daily_setup(self, game_date: date) -> dict | None:
+        def query(conn):
+            row = conn.execute(
+                "SELECT s.id, s.data, w.id, w.data FROM daily_setup s "
+                "LEFT JOIN word_pairs w ON w.id = s.word_pair_id WHERE s.date = ?",
+                (game_date.isoformat(),)
+            ).fetchone()
+            if not row:
+                return None
+            setup = self._row(row[0], row[1])
+            setup["word_pairs"] = self._row(row[2], row[3]) if row[2] else {}
+            return setup
+        return await self._run(query)
+
+    async def insert_daily_setup(self, row: dict) -> dict | None:
+        def query(conn):
+            row_id = str(uuid.uuid4())
+            data = {k: v for k, v in row.items() if k != "id"}
+            try:
+                conn.execute(
+                    "INSERT INTO daily_setup (id, date, word_pair_id, data) VALUES (?, ?, ?, ?)",
+                    (row_id, row["date"], row["word_pair_id"], json.dumps(data, ensure_ascii=False))
+                )
+            except sqlite3.IntegrityError:
+                return None
+            return {"id": row_id, **data}
+        return await self._run(query)
+
+    async def get_recent_word_pair_ids(self, since: date) -> set:
+        def query(conn):
+            rows = conn.execute("SELECT word_pair_id FROM daily_setup WHERE date >= ?", (since.isoformat(),)).fetchall()
+            return {row[0] for row in rows}
+        return await self._run(query)
+
+    async def get_game_state(self, state_hash: str) -> dict | None:
+        def query(conn):
+            row = conn.execute("SELECT id, data FROM game_states WHERE state_hash = ?", (state_hash,)).fetchone()
+            return self._row(*row) if row else None
+        return await self._run(query)
+
+    async def save_game_states(self, rows: list[dict]) -> list[dict]:
+        def query(conn):
+            conn.executemany(
+                "INSERT INTO game_states (id, state_hash, date, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (state_hash) DO UPDATE SET date = excluded.date, data = excluded.data",
+                [
+                    (
+                        str(uuid.uuid4()),
+                        row["state_hash"],
+                        row["date"],
+                        json.dumps({k: v for k, v in row.items() if k != "id"}, ensure_ascii=False)
+                    )
+                    for row in rows
+                ]
+            )
+            saved = []
+            for row in rows:
+                stored = conn.execute("SELECT id, data FROM game_states WHERE state_hash = ?", (row["state_hash"],)).fetchone()
+                saved.append(self._row(*stored))
+            return saved
+        return await self._run(query)
+
+    async def get_llm_response(self, key: str) -> dict | None:
+        def query(conn):
+            row = conn.execute("SELECT data FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row else None
+        return await self._run(query)
+
+    async def save_llm_response(self, row: dict):
+        def query(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO llm_responses (key, created_at, data) VALUES (?, ?, ?)",
+                (row["key"], row["created_at"], json.dumps(row, ensure_ascii=False))
+            )
+        await self._run(query)
+
+    async def delete_llm_responses_before(self, cutoff: datetime):
+        def query(conn):
+            conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (cutoff.isoformat(),))
+        await self._run(query)
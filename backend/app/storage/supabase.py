@@ -0,0 +1,61 @@
+from datetime import date, datetime
+from app.database import close_db, get_db, init_db
+from app.storage.base import StorageBackend
+
+
+class SupabaseStorage(StorageBackend):
+    """Storage backed by the Supabase REST API."""
+
+    name = "supabase"
+
+    async def init(self):
+        await init_db()
+
+    async def close(self):
+        await close_db()
+
+    async def list_word_pair_index(self) -> list[dict]:
+        result = await get_db().table("word_pairs").select("id,difficulty").execute()
+        return result.data or []
+
+    async def get_word_pair(self, word_pair_id: str) -> dict | None:
+        result = await get_db().table("word_pairs").select("*").eq("id", word_pair_id).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def insert_word_pairs(self, rows: list[dict]) -> list[dict]:
+        result = await get_db().table("word_pairs").insert(rows).execute()
+        return result.data or []
+
+    async def get_daily_setup(self, game_date: date) -> dict | None:
+        result = await get_db().table("daily_setup").select("*, word_pairs(*)").eq("date", game_date.isoformat()).execute()
+        return result.data[0] if result.data else None
+
+    async def insert_daily_setup(self, row: dict) -> dict | None:
+        result = await get_db().table("daily_setup").insert(row).execute()
+        return result.data[0] if result.data else None
+
+    async def get_recent_word_pair_ids(self, since: date) -> set:
+        result = await get_db().table("daily_setup").select("word_pair_id").gte("date", since.isoformat()).execute()
+        return {row["word_pair_id"] for row in result.data or []}
+
+    async def get_game_state(self, state_hash: str) -> dict | None:
+        result = await get_db().table("game_states").select("*").eq("state_hash", state_hash).execute()
+        return result.data[0] if result.data else None
+
+    async def save_game_states(self, rows: list[dict]) -> list[dict]:
+        result = await get_db().table("game_states").upsert(rows, on_conflict="state_hash").execute(raise_on_error=True)
+        return result.data or []
+
+    async def save_game_state(self, row: dict) -> dict | None:
+        result = await get_db().table("game_states").upsert(row, on_conflict="state_hash").execute(raise_on_error=True)
+        return result.data[0] if result.data else None
+
+    async def get_llm_response(self, key: str) -> dict | None:
+        result = await get_db().table("llm_responses").select("*").eq("key", key).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def save_llm_response(self, row: dict):
+        await get_db().table("llm_responses").upsert(row, on_conflict="key", ignore_duplicates=True).execute()
+
+    async def delete_llm_responses_before(self, cutoff: datetime):
+        await get_db().table("llm_responses").delete().lt("created_at", cutoff.isoformat()).execute()
@@ -0,0 +1,208 @@
+import json
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.config import get_settings
+
+settings = get_settings()
+
+# Request id of the current request, set by the HTTP middleware whether or not it is sampled
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_trace: ContextVar["Trace | None"] = ContextVar("trace", default=None)
+_span_id: ContextVar[str | None] = ContextVar("span_id", default=None)
+
+_file_lock = threading.Lock()
+_otel_tracer = None
+
+
+class Span:
+    """One timed operation inside a trace, shaped like an OpenTelemetry span."""
+
+    __slots__ = ("name", "span_id", "parent_span_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent_span_id: str | None, attributes: dict):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value):
+        pass
+
+
+class _OtelSpan:
+    """Adapts an OpenTelemetry span to the small interface used here."""
+
+    def __init__(self, span):
+        self._span = span
+
+    def set_attribute(self, key: str, value):
+        self._span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, request_id: str):
+        self.trace_id = secrets.token_hex(16)
+        self.request_id = request_id
+        self.spans: list[Span] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "request_id": self.request_id,
+            "spans": [span.to_dict() for span in self.spans]
+        }
+
+
+def get_request_id() -> str | None:
+    return _request_id.get()
+
+
+def _get_otel_tracer():
+    global _otel_tracer
+    if _otel_tracer is None:
+        try:
+            from opentelemetry import trace as otel_trace
+            _otel_tracer = otel_trace.get_tracer("ai-mole-game")
+        except ImportError:
+            print("TRACING_EXPORTER=otel but opentelemetry-api is not installed; tracing disabled")
+            _otel_tracer = False
+    return _otel_tracer or None
+
+
+@contextmanager
+def start_trace(name: str, request_id: str = None, **attributes):
+    """Open the root span for a request.
+
+    Sets the request id for everything running inside the block. The request
+    is traced with probability `tracing_sample_rate`; unsampled requests pay
+    only for the context variable.
+    """
+
+    request_id = request_id or secrets.token_hex(8)
+    id_token = _request_id.set(request_id)
+
+    trace = None
+    if settings.tracing_exporter in ("console", "file") and random.random() < settings.tracing_sample_rate:
+        trace = Trace(request_id)
+    trace_token = _trace.set(trace)
+
+    try:
+        with span(name, request_id=request_id, **attributes) as root:
+            yield root
+    finally:
+        _trace.reset(trace_token)
+        _request_id.reset(id_token)
+        if trace is not None:
+            _export(trace)
+
+
+def _export(trace: Trace):
+    """Write a finished trace as one JSON line to the console or the trace file."""
+
+    line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+    if settings.tracing_exporter == "console":
+        print(f"TRACE {line}")
+    elif settings.tracing_exporter == "file":
+        with _file_lock:
+            with open(settings.tracing_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a child of the current span.
+
+    A no-op unless the current request is sampled. Tasks created inside the
+    block inherit it as their parent, so concurrent model calls nest
+    correctly under the round that started them.
+    """
+
+    if settings.tracing_exporter == "otel":
+        tracer = _get_otel_tracer()
+        if tracer is None:
+            yield NOOP_SPAN
+            return
+        request_id = _request_id.get()
+        if request_id:
+            attributes.setdefault("request_id", request_id)
+        with tracer.start_as_current_span(name, attributes=attributes) as otel_span:
+            yield _OtelSpan(otel_span)
+        return
+
+    trace = _trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+
+    current = Span(name, _span_id.get(), attributes)
+    trace.spans.append(current)
+    token = _span_id.set(current.span_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _span_id.reset(token)
+
+
+class TracingMiddleware:
+    """ASGI middleware that wraps each HTTP request in a trace.
+
+    Reuses an incoming `X-Request-ID` header or makes one up, and echoes it
+    back on the response. Pure ASGI rather than BaseHTTPMiddleware so that
+    streamed (SSE) responses are traced until their last event.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or None
+
+        with start_trace(f"{scope['method']} {scope['path']}", incoming, method=scope["method"], path=scope["path"]) as root:
+            request_id = get_request_id()
+
+            async def send_with_request_id(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("status_code", message["status"])
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+                    }
+                await send(message)
+
+            await self.app(scope, receive, send_with_request_id)
@@ -0,0 +1 @@
+# Empty init files for Python packages
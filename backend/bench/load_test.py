@@ -0,0 +1,251 @@
+"""Midnight-rush load test for /api/daily and /api/play_turn.
+
+Runs the app in process (default) against in-memory storage and the mock
+LLM provider, or against a running server with --url. Every simulated
+player loads the daily game and then walks a random path through the
+elimination tree until the game ends.
+
+    cd backend
+    python -m bench.load_test --players 500 --concurrency 100 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+WORD_PAIRS = [
+    {"category": "Spor", "innocent_word": "Futbol", "mole_word": "Basketbol", "difficulty": 3},
+    {"category": "Meyve", "innocent_word": "Elma", "mole_word": "Armut", "difficulty": 2},
+    {"category": "Hayvan", "innocent_word": "Kedi", "mole_word": "Aslan", "difficulty": 3},
+    {"category": "Şehir", "innocent_word": "İstanbul", "mole_word": "İzmir", "difficulty": 4},
+    {"category": "İçecek", "innocent_word": "Çay", "mole_word": "Kahve", "difficulty": 2},
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--players", type=int, default=200, help="Number of simulated players")
+    parser.add_argument("--concurrency", type=int, default=50, help="Players active at the same time")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="Spread player arrivals over this many seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for player paths and the mock LLM")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="Median mock LLM latency")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Mock LLM error rate")
+    parser.add_argument("--precompute", action="store_true", help="Precompute the game tree before the rush")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results (e.g. branch name)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """Point settings at local stubs; must run before the app is imported."""
+    os.environ.setdefault("STORAGE_BACKEND", "memory")
+    os.environ.setdefault("LLM_PROVIDER", "mock")
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("PRECOMPUTE_ENABLED", "false")
+    os.environ["MOCK_LLM_DEFAULT_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["MOCK_LLM_DEFAULT_ERROR_RATE"] = str(args.llm_error_rate)
+    os.environ["MOCK_LLM_SEED"] = str(args.seed)
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return round(ordered[index] * 1000, 2)
+
+
+def summarize(latencies: list[float]) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.turns = 0
+        self.games_finished = 0
+
+    def add(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+async def timed(recorder: Recorder, endpoint: str, request):
+    started = time.perf_counter()
+    try:
+        response = await request
+        ok = response.status_code < 400
+    except Exception:
+        response, ok = None, False
+    recorder.add(endpoint, time.perf_counter() - started, ok)
+    return response if ok else None
+
+
+async def play_game(client, recorder: Recorder, rng: random.Random):
+    response = await timed(recorder, "/api/daily", client.get("/api/daily"))
+    if response is None:
+        return
+
+    daily = response.json()
+    state_hash = daily["initial_state_hash"]
+    round_number = 1
+    remaining = list(daily["turn_order"])
+
+    while True:
+        # Players pass in round 1 about a third of the time
+        if round_number == 1 and rng.random() < 1 / 3:
+            body = {"action": "PASS", "current_state_hash": state_hash}
+        else:
+            body = {"action": "ELIMINATE", "target_model": rng.choice(remaining), "current_state_hash": state_hash}
+
+        response = await timed(recorder, "/api/play_turn", client.post("/api/play_turn", json=body))
+        if response is None:
+            return
+
+        recorder.turns += 1
+        turn = response.json()
+        if turn["game_over"]:
+            recorder.games_finished += 1
+            return
+
+        state_hash = turn["state_hash"]
+        round_number = turn["round_number"]
+        remaining = turn["remaining_models"]
+
+
+async def run(args) -> dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    app = None
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120.0)
+    else:
+        from app.main import app
+        from app.storage import get_storage
+
+        await app.router.startup()
+        storage = get_storage()
+        if not await storage.list_word_pair_index():
+            await storage.insert_word_pairs(WORD_PAIRS)
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120.0)
+
+    async with client:
+        # Create today's setup and first round before the clock starts
+        await client.get("/api/daily")
+
+        if args.precompute and app is not None:
+            from app.services.precompute import precompute_game_tree
+            print(f"Precomputed: {await precompute_game_tree(max_states=10_000, concurrency=8)}")
+
+        llm_calls_before = _llm_calls(app)
+        health_before = (await client.get("/api/health")).json()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def player(index: int):
+            if args.ramp_seconds:
+                await asyncio.sleep(args.ramp_seconds * index / args.players)
+            async with semaphore:
+                await play_game(client, recorder, random.Random(rng.random()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(player(i) for i in range(args.players)))
+        elapsed = time.perf_counter() - started
+
+        health_after = (await client.get("/api/health")).json()
+        llm_calls = _llm_calls(app) - llm_calls_before if app is not None else None
+
+    if app is not None:
+        await app.router.shutdown()
+
+    requests = sum(len(v) for v in recorder.latencies.values())
+    cache_before = health_before.get("state_cache", {})
+    cache_after = health_after.get("state_cache", {})
+    hits = cache_after.get("hits", 0) - cache_before.get("hits", 0)
+    misses = cache_after.get("misses", 0) - cache_before.get("misses", 0)
+
+    return {
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "target": args.url or "in-process",
+            "players": args.players,
+            "concurrency": args.concurrency,
+            "ramp_seconds": args.ramp_seconds,
+            "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_error_rate": args.llm_error_rate,
+            "precompute": args.precompute,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 2) if elapsed else None,
+        "turns": recorder.turns,
+        "games_finished": recorder.games_finished,
+        "errors": recorder.errors,
+        "latency": {
+            "all": summarize([s for v in recorder.latencies.values() for s in v]),
+            **{endpoint: summarize(values) for endpoint, values in recorder.latencies.items()},
+        },
+        "state_cache": {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        },
+        "upstream_calls": llm_calls,
+        "upstream_calls_per_turn": round(llm_calls / recorder.turns, 3) if llm_calls is not None and recorder.turns else None,
+    }
+
+
+def _llm_calls(app) -> int:
+    if app is None:
+        return 0
+    from app.services.llm_providers import get_llm_provider
+    return getattr(get_llm_provider(), "calls", 0)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.url:
+        configure_environment(args)
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    results = asyncio.run(run(args))
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
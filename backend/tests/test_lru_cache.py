@@ -0,0 +1,33 @@
+from app.services.lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_zero_max_entries_is_unlimited():
+    cache = LRUCache(max_entries=0)
+    for i in range(100):
+        cache.set(str(i), i)
+
+    assert cache.get("0") == 0
+    assert len(cache) == 100
+    assert cache.evictions == 0
+
+
+def test_max_bytes_still_applies_without_entry_limit():
+    cache = LRUCache(max_entries=0, max_bytes=10)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "yyyy"
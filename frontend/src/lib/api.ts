@@ -27,8 +27,9 @@ export interface PlayTurnResponse {
 }
 
 export async function getDailyInfo(): Promise<DailyInfo> {
+    // Revalidated with the ETag on every load; unchanged days come back as 304
     const response = await fetch(`${API_URL}/api/daily`, {
-        cache: 'no-store',
+        cache: 'no-cache',
     });
 
     if (!response.ok) {
@@ -38,11 +39,45 @@ export async function getDailyInfo(): Promise<DailyInfo> {
     return response.json();
 }
 
+export async function getState(stateHash: string): Promise<PlayTurnResponse> {
+    const response = await fetch(`${API_URL}/api/state/${encodeURIComponent(stateHash)}`);
+
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.detail || 'Failed to fetch state');
+    }
+
+    return response.json();
+}
+
+export async function getNextState(
+    stateHash: string,
+    action: 'PASS' | 'ELIMINATE',
+    targetModel?: string
+): Promise<PlayTurnResponse> {
+    const params = new URLSearchParams({ action });
+    if (targetModel) params.set('target', targetModel);
+
+    // Plain GET, so the browser and CDN can serve repeat moves from cache
+    const response = await fetch(`${API_URL}/api/state/${encodeURIComponent(stateHash)}/next?${params}`);
+
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.detail || 'Failed to play turn');
+    }
+
+    return response.json();
+}
+
 export async function playTurn(
     action: 'PASS' | 'ELIMINATE',
     currentStateHash?: string,
     targetModel?: string
 ): Promise<PlayTurnResponse> {
+    if (currentStateHash) {
+        return getNextState(currentStateHash, action, targetModel);
+    }
+
     const response = await fetch(`${API_URL}/api/play_turn`, {
         method: 'POST',
         headers: {
@@ -62,3 +97,80 @@ export async function playTurn(
 
     return response.json();
 }
+
+export interface StreamHandlers<T> {
+    onState?: (state: Omit<T, 'dialogues'>) => void;
+    onDialogue?: (dialogue: ModelDialogue) => void;
+}
+
+async function readEventStream<T>(response: Response, handlers: StreamHandlers<T>): Promise<T> {
+    if (!response.ok || !response.body) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.detail || 'Failed to stream turn');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary: number;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const chunk = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of chunk.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+
+            const payload = data ? JSON.parse(data) : null;
+            if (event === 'state') handlers.onState?.(payload);
+            else if (event === 'dialogue') handlers.onDialogue?.(payload);
+            else if (event === 'error') throw new Error(payload?.detail || 'Failed to stream turn');
+            else if (event === 'done') return payload as T;
+        }
+    }
+
+    throw new Error('Stream ended unexpectedly');
+}
+
+export async function streamDailyInfo(
+    handlers: StreamHandlers<DailyInfo>,
+    ordered: boolean = true
+): Promise<DailyInfo> {
+    const response = await fetch(`${API_URL}/api/daily/stream?ordered=${ordered}`, {
+        cache: 'no-store',
+    });
+
+    return readEventStream(response, handlers);
+}
+
+export async function streamPlayTurn(
+    action: 'PASS' | 'ELIMINATE',
+    handlers: StreamHandlers<PlayTurnResponse>,
+    currentStateHash?: string,
+    targetModel?: string,
+    ordered: boolean = true
+): Promise<PlayTurnResponse> {
+    const response = await fetch(`${API_URL}/api/play_turn/stream?ordered=${ordered}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            action,
+            current_state_hash: currentStateHash,
+            target_model: targetModel,
+        }),
+    });
+
+    return readEventStream(response, handlers);
+}
@@ -1 +1,27 @@
+-- game_states.state_hash: game state writes upsert with on_conflict=state_hash, which needs a unique index.
+-- Remove duplicate rows left by concurrent inserts first, keeping the first one stored for each hash.
+DELETE FROM game_states a USING game_states b WHERE a.state_hash = b.state_hash AND a.ctid > b.ctid;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_game_states_state_hash ON game_states (state_hash);
 
+-- daily_setup.date: workers racing to create a day's setup rely on this to keep exactly one, since state keys hold only the date.
+-- Remove duplicate setups first, keeping the first one stored for each date.
+DELETE FROM daily_setup a USING daily_setup b WHERE a.date = b.date AND a.ctid > b.ctid;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_setup_date ON daily_setup (date);
+
+-- generation_locks: cross-worker lock rows for GENERATION_LOCK=db (one per state hash or precompute date)
+CREATE TABLE IF NOT EXISTS generation_locks (
+    state_hash TEXT PRIMARY KEY,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- game_states.parent_hash: the state a row was generated from, used to rebuild prompt history across rounds
+ALTER TABLE game_states ADD COLUMN IF NOT EXISTS parent_hash TEXT;
+
+-- llm_responses: content-addressed cache of upstream replies (LLM_RESPONSE_CACHE=db)
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    route TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_created_at ON llm_responses (created_at);